@@ -0,0 +1,59 @@
+"""
+Benchmark of the JSON encoding of large `get_all` responses, in customers per second
+
+Compares Flask's stdlib provider with `utils.json_provider.FastJSONProvider`,
+with and without orjson, on pages of serialized customers.
+
+    PYTHONPATH=src python benchmarks/bench_json.py [customers] [repeat]
+"""
+import sys
+import timeit
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from flask.json.provider import DefaultJSONProvider
+
+from models import Customer
+from server import server
+from utils import json_provider
+from utils.json_provider import FastJSONProvider
+
+
+def page(customers):
+    """ The body of a `get_all` page, as the serializer dumps it """
+    serializer = Customer.serializer()
+    now = datetime(2026, 10, 17, 18, 30)
+    rows = [
+        tuple({
+            "id": index, "username": f"user{index}", "first_name": "Chukwuemeka",
+            "last_name": "Okonkwo", "email": f"user{index}@mail.com", "phone": "+2348012345678",
+            "country": "Nigeria", "state": "Lagos", "city": "Ikeja", "street_name": "Allen Avenue",
+            "zipcode": "100001", "created_at": now - timedelta(days=index),
+            "updated_at": now, "version": 1,
+        }.get(column) for column in serializer.columns)
+        for index in range(customers)
+    ]
+    return {"data": [serializer.dump_row(row) for row in rows], "next_cursor": "eyJpZCI6Mn0"}
+
+
+if __name__ == "__main__":
+    customers = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    body = page(customers)
+
+    # production responses are compact
+    server.debug = False
+    print(f"pages of {customers} customers, best of {repeat}")
+    with server.app_context():
+        providers = [
+            ("flask stdlib", DefaultJSONProvider(server), None),
+            ("fast, stdlib", FastJSONProvider(server), patch.object(json_provider, "orjson", None)),
+            ("fast, orjson", FastJSONProvider(server), None),
+        ]
+        for name, provider, fallback in providers:
+            if fallback is not None:
+                fallback.start()
+            elapsed = min(timeit.repeat(lambda: provider.response(body), number=1, repeat=repeat))
+            if fallback is not None:
+                fallback.stop()
+            print(f"  {name:<14} {customers / elapsed:>12,.0f} customers/s  {elapsed * 1000:>7.1f} ms")
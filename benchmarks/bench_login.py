@@ -0,0 +1,49 @@
+"""
+Benchmark of password verifications (logins) per second under concurrency
+
+Compares verifying on the request threads with the bounded process pool of
+`utils.password_hasher`, and counts the requests turned away with a 503.
+
+    PYTHONPATH=src python benchmarks/bench_login.py [threads] [logins]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from utils.errors import ServiceUnavailable
+from utils.password_hasher import PasswordHasher
+
+
+def run(hasher, pwhash, threads, logins):
+    def login(_):
+        try:
+            return hasher.verify(pwhash, "secret")
+        except ServiceUnavailable:
+            return None
+
+    # warm the pool up so process start up is not measured
+    hasher.verify(pwhash, "secret")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    rejected = results.count(None)
+    return (logins - rejected) / elapsed, rejected
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    logins = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+    settings = dict(method=config.PASSWORD_HASH_METHOD, salt_length=config.PASSWORD_SALT_LENGTH,
+                    queue_size=config.PASSWORD_HASH_QUEUE_SIZE, timeout=60)
+    inline = PasswordHasher(workers=0, **settings)
+    pooled = PasswordHasher(workers=config.PASSWORD_HASH_WORKERS, **settings)
+    pwhash = inline.hash("secret")
+
+    print(f"{threads} threads, {logins} logins, {config.PASSWORD_HASH_METHOD}")
+    for name, hasher in (("request thread", inline), ("process pool", pooled)):
+        rate, rejected = run(hasher, pwhash, threads, logins)
+        print(f"  {name:<15} {rate:>8.1f} logins/s  {rejected} rejected with 503")
+        hasher.shutdown()
@@ -0,0 +1,76 @@
+"""
+Benchmark of the customer search on a generated dataset, in milliseconds per query
+
+Fills the customers of the test database (DB_TEST_NAME, Postgres) with generated
+customers, once, then times `CustomerRepository.search` for a few kinds of searches.
+Everything in the test database is dropped first when its customers are missing.
+
+    PYTHONPATH=src python benchmarks/bench_search.py [customers] [repeat]
+"""
+import statistics
+import sys
+import time
+
+import config
+from models import db, Customer
+from repositories import CustomerRepository
+from server import server
+
+# a part of a name, a name with a typo, an email domain part, a phone suffix
+SEARCHES = ["ngoz", "Chukwuemekq", "user12345@", "5550123", "nobody-matches-this"]
+
+FILL = """
+INSERT INTO customers (username, email, first_name, last_name, phone, password,
+                       city, created_at, updated_at, version)
+SELECT 'user' || n, 'user' || n || '@' || (ARRAY['mail.com', 'shop.ng', 'example.org'])[n % 3 + 1],
+       (ARRAY['Ngozi', 'Chukwuemeka', 'Amaka', 'Tunde', 'Bola', 'Ifeanyi', 'Zainab'])[n % 7 + 1]
+           || (n % 1000),
+       (ARRAY['Okafor', 'Adeyemi', 'Bello', 'Eze', 'Okonkwo', 'Danjuma'])[n % 6 + 1] || (n % 997),
+       '+234' || lpad((n * 7919 % 10000000)::text, 10, '0'), 'hash',
+       (ARRAY['Lagos', 'Abuja', 'Kano', 'Enugu'])[n % 4 + 1], now(), now(), 1
+FROM generate_series(1, :customers) AS n
+"""
+
+
+def fill(customers):
+    """ Generate the customers in the database, the indexes are built after the rows """
+    db.drop_all()
+    db.create_all()
+    indexes = [index for index in Customer.__table__.indexes if index.name.endswith("_trgm")]
+    for index in indexes:
+        index.drop(db.engine)
+    start = time.perf_counter()
+    db.session.execute(db.text(FILL), {"customers": customers})
+    db.session.commit()
+    for index in indexes:
+        index.create(db.engine)
+    db.session.execute(db.text("ANALYZE customers"))
+    db.session.commit()
+    print(f"generated {customers} customers in {time.perf_counter() - start:.0f}s")
+
+
+def run(text, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = CustomerRepository.search(text, config.PAGE_SIZE_DEFAULT)
+        timings.append((time.perf_counter() - start) * 1000)
+    return len(results), statistics.median(timings), max(timings)
+
+
+if __name__ == "__main__":
+    customers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    server.config["SQLALCHEMY_DATABASE_URI"] = config.DB_URI.rsplit("/", 1)[0] + \
+        f"/{config.DB_TEST_NAME}"
+    with server.app_context():
+        present = db.session.execute(db.text("SELECT to_regclass('customers')")).scalar() and \
+            db.session.execute(db.text("SELECT count(*) FROM customers")).scalar()
+        if present != customers:
+            fill(customers)
+
+        print(f"{customers} customers, {repeat} runs per search, limit {config.PAGE_SIZE_DEFAULT}")
+        for text in SEARCHES:
+            found, median, worst = run(text, repeat)
+            print(f"  {text!r:<24} {found:>4} found  {median:>7.1f} ms median  {worst:>7.1f} ms max")
@@ -0,0 +1,48 @@
+"""
+Measurement of the import and start up time of the app, with the docs on and off
+
+Starts a fresh interpreter importing `server` and answering a first request,
+SWAGGER_ENABLED set then unset, and reports the median wall time of each.
+
+    PYTHONPATH=src python benchmarks/bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+SCRIPT = """
+import time
+start = time.perf_counter()
+from server import server
+imported = time.perf_counter()
+server.test_client().get("/api")
+print(imported - start, time.perf_counter() - imported)
+"""
+
+
+def measure(swagger_enabled, runs):
+    env = dict(os.environ, SWAGGER_ENABLED=str(swagger_enabled).lower())
+    env.setdefault("ENVIRONEMENT", "DEV")
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", SCRIPT], cwd=SRC, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        total = time.perf_counter() - start
+        imported, first_request = map(float, output.split()[-2:])
+        timings.append((total, imported, first_request))
+    return [statistics.median(timing) * 1000 for timing in zip(*timings)]
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    print(f"median of {runs} cold starts, in ms")
+    print(f"  {'SWAGGER_ENABLED':<16} {'process':>8} {'import':>8} {'1st request':>12}")
+    for enabled in (True, False):
+        total, imported, first_request = measure(enabled, runs)
+        print(f"  {str(enabled):<16} {total:>8.0f} {imported:>8.0f} {first_request:>12.1f}")
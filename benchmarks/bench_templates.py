@@ -0,0 +1,48 @@
+"""
+Benchmark of the email template renders per second
+
+Compares a new Environment per Notification, as before, with the shared
+environment and its bytecode cache.
+
+    PYTHONPATH=src python benchmarks/bench_templates.py
+"""
+import timeit
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from models import Customer
+from utils.notification_sender import TEMPLATES_FOLDER, Notification, precompile_templates
+
+RENDERS = 2000
+TEMPLATE = "user_verification_email.html"
+
+
+def render_with_new_environment(customer):
+    """ `Notification(email=True)` before the shared environment """
+    env = Environment(loader=FileSystemLoader(TEMPLATES_FOLDER),
+                      autoescape=select_autoescape(['html', 'xml']))
+    return env.get_template(TEMPLATE).render(confirm_url="http://localhost/confirm",
+                                             customer=customer)
+
+
+def render_with_shared_environment(customer):
+    return Notification(email=True).create_email_template(TEMPLATE,
+                                                          confirm_url="http://localhost/confirm",
+                                                          customer=customer)
+
+
+def rate(func):
+    best = min(timeit.repeat(func, number=1, repeat=5))
+    return RENDERS / best
+
+
+if __name__ == "__main__":
+    customer = Customer(first_name="John", last_name="Doe")
+    precompile_templates()
+
+    before = rate(lambda: [render_with_new_environment(customer) for _ in range(RENDERS)])
+    after = rate(lambda: [render_with_shared_environment(customer) for _ in range(RENDERS)])
+
+    print(f"{TEMPLATE}")
+    print(f"  new environment per email  {before:>10,.0f} renders/s")
+    print(f"  shared environment         {after:>10,.0f} renders/s  x{after / before:.0f}")
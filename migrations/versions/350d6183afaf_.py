@@ -0,0 +1,76 @@
+"""Add the customers change feed, updated_at index, triggers and tombstones
+
+Revision ID: 350d6183afaf
+Revises: a308ed20e3a1
+Create Date: 2026-10-17 19:21:07.645230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '350d6183afaf'
+down_revision = 'a308ed20e3a1'
+branch_labels = None
+depends_on = None
+
+# a copy of models.customer.CHANGE_FEED_TRIGGERS as of this revision, frozen with it
+TRIGGERS = """
+CREATE OR REPLACE FUNCTION customers_touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := timezone('utc', clock_timestamp());
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER customers_touch_updated_at BEFORE INSERT OR UPDATE ON customers
+    FOR EACH ROW EXECUTE FUNCTION customers_touch_updated_at();
+
+CREATE OR REPLACE FUNCTION customers_tombstone() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO customer_tombstones (customer_id, deleted_at)
+    VALUES (OLD.id, timezone('utc', clock_timestamp()))
+    ON CONFLICT (customer_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+    RETURN OLD;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER customers_tombstone AFTER DELETE ON customers
+    FOR EACH ROW EXECUTE FUNCTION customers_tombstone();
+"""
+
+
+def upgrade():
+    op.create_table('customer_tombstones',
+    sa.Column('customer_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('customer_id')
+    )
+    op.create_index('ix_customer_tombstones_deleted_at_customer_id', 'customer_tombstones',
+                    ['deleted_at', 'customer_id'], unique=False)
+
+    # customers never updated show in the feed from their creation
+    op.execute("UPDATE customers SET updated_at = coalesce(created_at, now()) "
+               "WHERE updated_at IS NULL")
+
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index('ix_customers_updated_at_id', 'customers', ['updated_at', 'id'])
+        return
+
+    op.execute(TRIGGERS)
+    # build the index without locking the writes to customers
+    with op.get_context().autocommit_block():
+        op.create_index('ix_customers_updated_at_id', 'customers', ['updated_at', 'id'],
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS customers_tombstone ON customers")
+        op.execute("DROP TRIGGER IF EXISTS customers_touch_updated_at ON customers")
+        op.execute("DROP FUNCTION IF EXISTS customers_tombstone()")
+        op.execute("DROP FUNCTION IF EXISTS customers_touch_updated_at()")
+
+    op.drop_index('ix_customers_updated_at_id', table_name='customers')
+    op.drop_index('ix_customer_tombstones_deleted_at_customer_id',
+                  table_name='customer_tombstones')
+    op.drop_table('customer_tombstones')
@@ -0,0 +1,64 @@
+"""Add unique case-insensitive login indexes on customers
+
+Revision ID: 6062001ade2f
+Revises: 13dbcf71b2dc
+Create Date: 2026-10-17 18:02:11.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6062001ade2f'
+down_revision = '13dbcf71b2dc'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_customers_lower_username': 'lower(username)',
+    'ix_customers_lower_email': 'lower(email)',
+}
+LOGIN_COLUMNS = ('username', 'email')
+
+# the customers whose login differs only by its case from the login of an older customer
+DUPLICATES = """
+    SELECT customers.id, kept.id FROM customers
+    JOIN customers AS kept
+        ON lower(kept.{column}) = lower(customers.{column}) AND kept.id < customers.id
+    ORDER BY customers.id, kept.id
+"""
+
+
+def check_duplicates():
+    """ Refuse to build the unique indexes over logins differing only by their case
+        The logins are customer data, they are fixed by hand, never by the migration """
+    bind = op.get_bind()
+    clashes = []
+    for column in LOGIN_COLUMNS:
+        clashes.extend(f'{column} of customer {customer_id} clashes with customer {kept_id}'
+                       for customer_id, kept_id in bind.execute(
+                           sa.text(DUPLICATES.format(column=column))))
+    if clashes:
+        raise RuntimeError('Logins differing only by their case must be fixed before this '
+                           'migration:\n' + '\n'.join(clashes))
+
+
+def upgrade():
+    check_duplicates()
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # build the indexes without locking the writes to customers
+        with op.get_context().autocommit_block():
+            for name, expression in INDEXES.items():
+                op.create_index(name, 'customers', [sa.text(expression)], unique=True,
+                                postgresql_concurrently=True)
+        return
+
+    for name, expression in INDEXES.items():
+        op.create_index(name, 'customers', [sa.text(expression)], unique=True)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name='customers')
@@ -0,0 +1,41 @@
+"""Add trigram search indexes on customers
+
+Revision ID: a308ed20e3a1
+Revises: 6062001ade2f
+Create Date: 2026-10-17 18:40:52.107364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a308ed20e3a1'
+down_revision = '6062001ade2f'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ('first_name', 'last_name', 'email', 'phone')
+
+
+def upgrade():
+    # the trigram operator classes only exist on Postgres
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # GiST rather than GIN, it also reads the values in <-> distance order
+    # build the indexes without locking the writes to customers
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.create_index(f'ix_customers_{column}_trgm', 'customers', [column],
+                            postgresql_using='gist', postgresql_ops={column: 'gist_trgm_ops'},
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for column in COLUMNS:
+        op.drop_index(f'ix_customers_{column}_trgm', table_name='customers')
@@ -21,12 +21,102 @@ APPLICATION_ROOT = os.getenv("API_APPLICATION_ROOT", "/api")
 HOST = os.getenv("APPLICATION_HOST")
 PORT = int(os.getenv("APPLICATION_PORT", "3000"))
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+# serve the docs UI and the spec, production workers can skip loading them
+SWAGGER_ENABLED = os.getenv("SWAGGER_ENABLED", "true").lower() == "true"
+
+# Verification tokens configs
+# "database" stores random tokens, "signed" issues stateless signed tokens
+VERIFICATION_TOKEN_MODE = os.getenv("VERIFICATION_TOKEN_MODE", "database")
+# minutes a verification token stays valid
+VERIFICATION_TOKEN_EXPIRY = int(os.getenv("VERIFICATION_TOKEN_EXPIRY", "10"))
+
+# Maintenance scheduler configs, it runs in the background worker
+MAINTENANCE_ENABLED = os.getenv("MAINTENANCE_ENABLED", "true").lower() == "true"
+# seconds between two purges of the expired tokens
+PURGE_INTERVAL = int(os.getenv("PURGE_INTERVAL", "300"))
+# rows deleted per transaction, keeps the locks short
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "1000"))
+
+# Cache configs
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+# entries kept in the cache of each process
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "10000"))
+# seconds an entry is served, bounds how long another process can serve a stale entry
+CACHE_TTL = int(os.getenv("CACHE_TTL", "30"))
+# e.g. redis://localhost:6379/0 to share the entries between processes, needs `redis`
+CACHE_SHARED_URL = os.getenv("CACHE_SHARED_URL", "")
+
+# Compression configs, brotli is offered when `brotli` is installed
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# bytes under which a body is sent as it is, compression would not pay for itself
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_MIMETYPES = os.getenv(
+    "COMPRESSION_MIMETYPES", "application/json,text/html,text/css,text/javascript,text/csv"
+).split(",")
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+# Unit of work configs
+# collect the saves of a request into one commit at its end, error responses roll back
+UNIT_OF_WORK_PER_REQUEST = os.getenv("UNIT_OF_WORK_PER_REQUEST", "true").lower() == "true"
+# report the commits of each request in an X-DB-Commits header
+DB_COMMIT_HEADER = os.getenv("DB_COMMIT_HEADER", str(DEBUG)).lower() == "true"
+
+# Pagination configs
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
+# shortest search, trigram indexes cannot serve less than 3 characters
+SEARCH_MIN_LENGTH = int(os.getenv("SEARCH_MIN_LENGTH", "3"))
+# seconds the change feed stays behind, longer than the transactions writing customers
+CHANGES_LAG = int(os.getenv("CHANGES_LAG", "5"))
+# seconds the deletions stay in the change feed, a client syncing less often than this
+# misses deletions and has to read every customer again
+TOMBSTONE_RETENTION = int(os.getenv("TOMBSTONE_RETENTION", str(30 * 24 * 3600)))
+# customers resolved by one request of ids
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "500"))
+# rows fetched per round trip from the server-side cursor of the exports
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+# customers validated, hashed and inserted together by the imports
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+
+# Password hashing configs
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:260000")
+PASSWORD_SALT_LENGTH = int(os.getenv("PASSWORD_SALT_LENGTH", "16"))
+# processes hashing passwords, 0 hashes on the request thread
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+# hashes waiting for a worker before requests are answered with a 503
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
 
 # Notification configs
-EMAIL_API_SECRET = os.getenv("EMAIL_API_KEY", '')
-EMAIL_API_KEY = os.getenv("EMAIL_API_SECRET", '')
+EMAIL_API_KEY = os.getenv("EMAIL_API_KEY", '')
+EMAIL_API_SECRET = os.getenv("EMAIL_API_SECRET", '')
 EMAIL_SENDER_NAME = os.getenv("EMAIL_SENDER_NAME", '')
 EMAIL_SENDER_EMAIL = os.getenv("EMAIL_SENDER_EMAIL", '')
+EMAIL_API_URL = os.getenv("EMAIL_API_URL", "https://api.mailjet.com/")
+# keep-alive connections kept to Mailjet, at least OUTBOX_CONCURRENCY
+EMAIL_HTTP_POOL_SIZE = int(os.getenv("EMAIL_HTTP_POOL_SIZE", "10"))
+EMAIL_HTTP_CONNECT_TIMEOUT = float(os.getenv("EMAIL_HTTP_CONNECT_TIMEOUT", "3"))
+EMAIL_HTTP_READ_TIMEOUT = float(os.getenv("EMAIL_HTTP_READ_TIMEOUT", "15"))
+# compiled email templates, the temporary directory of the system by default
+TEMPLATE_BYTECODE_CACHE_DIR = os.getenv("TEMPLATE_BYTECODE_CACHE_DIR") or None
+# compile the email templates when the server starts instead of on first use,
+# by default only where emails are sent, the other processes skip importing jinja
+PRECOMPILE_TEMPLATES = os.getenv("PRECOMPILE_TEMPLATES",
+                                 "true" if EMAIL_API_KEY else "false").lower() == "true"
+# messages sent per Mailjet call, the v3.1 send API accepts up to 50
+MAILJET_BATCH_SIZE = int(os.getenv("MAILJET_BATCH_SIZE", "50"))
+
+# Email outbox worker configs
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "8"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+# seconds a claimed email is hidden from the other workers
+OUTBOX_LEASE = int(os.getenv("OUTBOX_LEASE", "300"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+# delay before the first retry, doubled on every attempt up to OUTBOX_MAX_BACKOFF
+OUTBOX_BACKOFF = int(os.getenv("OUTBOX_BACKOFF", "30"))
+OUTBOX_MAX_BACKOFF = int(os.getenv("OUTBOX_MAX_BACKOFF", "3600"))
 
 if DEBUG:
     logging.basicConfig(
@@ -4,3 +4,6 @@ db = SQLAlchemy()
 
 from .customer import Customer
 from .verification_token import VerificationToken
+from .email_outbox import EmailOutbox
+from .used_verification_token import UsedVerificationToken
+from .customer_tombstone import CustomerTombstone
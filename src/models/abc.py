@@ -1,13 +1,15 @@
 """
 Define an Abstract Base Class (ABC) for models
 """
-from datetime import datetime
 from weakref import WeakValueDictionary
 
-from sqlalchemy import inspect
-from sqlalchemy.orm import aliased
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, aliased
 
+from utils.cache import get_cache
 from . import db
+from .serializer import Serializer
+from .unit_of_work import after_commit, commit
 
 
 class MetaBaseModel(db.Model.__class__):
@@ -33,6 +35,8 @@ class BaseModel:
 
     print_filter = ('password')
     to_json_filter = ('password')
+    # the name of the cache holding copies of the model, None when it is not cached
+    cache_name = None
 
     def __repr__(self):
         """ Define a base way to print models
@@ -46,17 +50,21 @@ class BaseModel:
             },
         )
 
+    @classmethod
+    def serializer(cls):
+        """ Return the serialization plan of the model, compiled on first use
+            Columns inside `to_json_filter` are excluded """
+        plan = cls.__dict__.get("_serializer")
+        if plan is None:
+            plan = Serializer.compile(cls)
+            cls._serializer = plan
+        return plan
+
     @property
     def json(self):
         """ Define a base way to jsonify models
             Columns inside `to_json_filter` are excluded """
-        return {
-            column: value
-            if not isinstance(value, datetime)
-            else value.strftime("%Y-%m-%d")
-            for column, value in self._to_dict().items()
-            if column not in self.to_json_filter
-        }
+        return self.serializer().dump(self)
 
     def _to_dict(self):
         """ This would more or less be the same as a `to_json`
@@ -69,11 +77,37 @@ class BaseModel:
             for column in inspect(self.__class__).attrs
         }
 
+    def cache_keys(self):
+        """ The keys of the cached copies of the model """
+        return []
+
+    def invalidate_cache(self, keys=None):
+        """ Drop the cached copies of the model """
+        if self.cache_name is not None:
+            get_cache(self.cache_name).delete(*(keys if keys is not None else self.cache_keys()))
+
     def save(self):
+        """ Commit the model, inside a unit of work only flush it """
+        keys = self.cache_keys()
         db.session.add(self)
-        db.session.commit()
+        commit()
+        # the flush invalidated the cache already, this drops the copies
+        # cached by other requests before the commit made the change visible
+        after_commit(lambda: self.invalidate_cache(keys))
         return self
 
     def delete(self):
+        """ Delete the model, inside a unit of work only flush it """
+        keys = self.cache_keys()
         db.session.delete(self)
-        db.session.commit()
+        commit()
+        after_commit(lambda: self.invalidate_cache(keys))
+
+
+@event.listens_for(Session, "after_flush")
+def invalidate_flushed_models(session, flush_context):
+    """ Invalidate the cached copies of the models changed by a flush
+        This covers changes flushed without `save` or `delete` """
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, BaseModel) and instance.cache_name is not None:
+            instance.invalidate_cache()
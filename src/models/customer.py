@@ -2,17 +2,27 @@
 Define the Customer model
 """
 import uuid
+from sqlalchemy import DDL, event, inspect
 from . import db
 from .abc import BaseModel, MetaBaseModel
+from .customer_tombstone import CustomerTombstone
 from datetime import datetime
 
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.password_hasher import password_hasher
 
 
 class Customer(db.Model, BaseModel, metaclass=MetaBaseModel):
     """ The Customer model """
 
     __tablename__ = "customers"
+    __table_args__ = (
+        # keyset pagination walks `id` inside the optional location filters
+        db.Index("ix_customers_country_state_city_id", "country", "state", "city", "id"),
+        db.Index("ix_customers_state_city_id", "state", "city", "id"),
+        db.Index("ix_customers_city_id", "city", "id"),
+        # the change feed walks the updates in this order
+        db.Index("ix_customers_updated_at_id", "updated_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     # id = db.Column(db.String(), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -28,10 +38,80 @@ class Customer(db.Model, BaseModel, metaclass=MetaBaseModel):
     street_name = db.Column(db.String(50))
     zipcode = db.Column(db.String(50))
     created_at = db.Column(db.DateTime(), default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime(), default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime(), default=datetime.utcnow, onupdate=datetime.utcnow)
+    # bumped by every update, the updates of a stale version are refused
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
+    cache_name = "customer"
+
+    def cache_keys(self):
+        """ The customer is cached by id, the logins map to the id
+            Keys of the username/email being replaced are included """
+        keys = [f"id:{self.id}"]
+        state = inspect(self)
+        for attr in ("username", "email"):
+            values = {getattr(self, attr), *state.attrs[attr].history.deleted}
+            keys.extend(f"login:{value.lower()}" for value in values if value)
+        return keys
 
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return password_hasher.verify(self.password, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password)
+
+
+# logins are matched ignoring the case, see CustomerRepository._login_condition
+# so two customers cannot have logins differing only by their case
+db.Index("ix_customers_lower_username", db.func.lower(Customer.username), unique=True)
+db.Index("ix_customers_lower_email", db.func.lower(Customer.email), unique=True)
+
+# the search matches parts of these columns and reads the nearest values first,
+# GiST serves both the matching and the <-> distance order, see CustomerRepository.search
+for column in ("first_name", "last_name", "email", "phone"):
+    db.Index(f"ix_customers_{column}_trgm", getattr(Customer, column), postgresql_using="gist",
+             postgresql_ops={column: "gist_trgm_ops"})
+
+event.listen(Customer.__table__, "before_create",
+             DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+
+# on Postgres every write sets `updated_at`, including the writes made without the ORM,
+# and every deletion leaves a tombstone, see CustomerRepository.changes
+# used by db.create_all, the migrations keep their own copy, a change needs a new revision
+CHANGE_FEED_TRIGGERS = """
+CREATE OR REPLACE FUNCTION customers_touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := timezone('utc', clock_timestamp());
+    RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER customers_touch_updated_at BEFORE INSERT OR UPDATE ON customers
+    FOR EACH ROW EXECUTE FUNCTION customers_touch_updated_at();
+
+CREATE OR REPLACE FUNCTION customers_tombstone() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO customer_tombstones (customer_id, deleted_at)
+    VALUES (OLD.id, timezone('utc', clock_timestamp()))
+    ON CONFLICT (customer_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+    RETURN OLD;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER customers_tombstone AFTER DELETE ON customers
+    FOR EACH ROW EXECUTE FUNCTION customers_tombstone();
+"""
+
+event.listen(db.metadata, "after_create",
+             DDL(CHANGE_FEED_TRIGGERS).execute_if(dialect="postgresql"))
+
+
+@event.listens_for(Customer, "after_delete")
+def leave_tombstone(mapper, connection, customer):
+    """ Record the deletion for the change feed, where no trigger does it """
+    if connection.dialect.name != "postgresql":
+        connection.execute(CustomerTombstone.__table__.insert().values(
+            customer_id=customer.id, deleted_at=datetime.utcnow()))
@@ -0,0 +1,20 @@
+"""
+Define the CustomerTombstone model
+"""
+from . import db
+from .abc import BaseModel, MetaBaseModel
+from datetime import datetime
+
+
+class CustomerTombstone(db.Model, BaseModel, metaclass=MetaBaseModel):
+    """ The CustomerTombstone model, the trace of a deleted customer for the change feed
+        Written by a trigger on Postgres, by the `after_delete` event elsewhere """
+
+    __tablename__ = "customer_tombstones"
+    __table_args__ = (
+        # the change feed walks the deletions in this order
+        db.Index("ix_customer_tombstones_deleted_at_customer_id", "deleted_at", "customer_id"),
+    )
+
+    customer_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    deleted_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
@@ -0,0 +1,35 @@
+"""
+Define the EmailOutbox model
+"""
+from . import db
+from .abc import BaseModel, MetaBaseModel
+from datetime import datetime
+
+
+class EmailOutbox(db.Model, BaseModel, metaclass=MetaBaseModel):
+    """ The EmailOutbox model, an email waiting to be delivered by the worker """
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # the worker polls the pending emails that are due
+        db.Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+    id = db.Column(db.Integer, primary_key=True)
+    sender_email = db.Column(db.String(100), nullable=False)
+    sender_name = db.Column(db.String(300))
+    recipient_email = db.Column(db.String(100), nullable=False)
+    recipient_name = db.Column(db.String(300))
+    subject = db.Column(db.String(300), nullable=False)
+    html = db.Column(db.Text(), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text())
+    sent_at = db.Column(db.DateTime())
+    created_at = db.Column(db.DateTime(), default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime(), default=datetime.utcnow)
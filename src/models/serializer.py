@@ -0,0 +1,89 @@
+"""
+Define the serialization plans of the models
+A plan is compiled once per model class, it knows the columns to output
+and how to encode each of them, so serializing a row is only attribute
+lookups and a dict build
+"""
+from datetime import datetime
+from operator import attrgetter
+
+from sqlalchemy import inspect
+from sqlalchemy.types import Date, DateTime
+
+
+def _format_date(value):
+    # same output as strftime("%Y-%m-%d"), without parsing a format string per value
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.isoformat()
+
+
+# encoders by column type, columns of other types are output as they are
+TYPE_ENCODERS = (
+    (DateTime, _format_date),
+    (Date, _format_date),
+)
+
+
+def _encoder_for(column_type):
+    for type_, encoder in TYPE_ENCODERS:
+        if isinstance(column_type, type_):
+            return encoder
+    return None
+
+
+class Serializer:
+    """ The serialization plan of a model for a given list of columns """
+
+    def __init__(self, model, columns):
+        self.model = model
+        self.columns = tuple(columns)
+        # the mapped attributes to select, to query the plan columns only
+        self.attributes = tuple(getattr(model, column) for column in self.columns)
+        mapper = inspect(model)
+        self._encoders = tuple(
+            (index, encoder)
+            for index, encoder in enumerate(
+                _encoder_for(mapper.columns[column].type) for column in self.columns
+            )
+            if encoder is not None
+        )
+        getter = attrgetter(*self.columns)
+        # attrgetter returns a bare value instead of a tuple for a single column
+        self._getter = getter if len(self.columns) > 1 else lambda obj: (getter(obj),)
+        self._subsets = {}
+
+    @classmethod
+    def compile(cls, model):
+        """ Build the plan of `model` for the columns not in `to_json_filter` """
+        excluded = model.to_json_filter
+        if isinstance(excluded, str):
+            excluded = (excluded,)
+        columns = [attr.key for attr in inspect(model).column_attrs if attr.key not in excluded]
+        return cls(model, columns)
+
+    def subset(self, columns):
+        """ The plan for only some of the columns, in the order of this plan """
+        key = frozenset(columns)
+        plan = self._subsets.get(key)
+        if plan is None:
+            plan = Serializer(self.model, [column for column in self.columns if column in key])
+            self._subsets[key] = plan
+        return plan
+
+    def encode_row(self, row):
+        """ Encode the values of a row holding the columns of the plan, in order """
+        values = list(row)
+        for index, encoder in self._encoders:
+            value = values[index]
+            if value is not None:
+                values[index] = encoder(value)
+        return values
+
+    def dump_row(self, row):
+        """ Serialize a `Row`/tuple holding the columns of the plan, in order """
+        return dict(zip(self.columns, self.encode_row(row)))
+
+    def dump(self, obj):
+        """ Serialize a model instance """
+        return self.dump_row(self._getter(obj))
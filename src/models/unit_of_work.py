@@ -0,0 +1,126 @@
+"""
+Define the unit of work, collecting the changes of a request into a single commit
+"""
+import logging
+from contextlib import contextmanager
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import config
+from . import db
+
+
+def in_unit_of_work():
+    """ Whether the changes are collected by a unit of work """
+    return has_app_context() and g.get("unit_of_work_depth", 0) > 0
+
+
+def commit():
+    """ Commit the session, inside a unit of work only flush it,
+        the unit of work commits once at its end """
+    if in_unit_of_work():
+        db.session.flush()
+    else:
+        db.session.commit()
+
+
+def after_commit(callback):
+    """ Call `callback` once the changes are committed, right away outside a unit of work """
+    if in_unit_of_work():
+        g.unit_of_work_callbacks.append(callback)
+    else:
+        callback()
+
+
+def begin():
+    """ Start collecting the changes """
+    g.unit_of_work_depth = 1
+    g.unit_of_work_callbacks = []
+
+
+def end(success=True, expire=True):
+    """ Commit the collected changes, or roll them all back
+        Without `expire` the models keep their loaded state after the commit """
+    g.unit_of_work_depth = 0
+    callbacks = g.pop("unit_of_work_callbacks", [])
+    if not success:
+        db.session.rollback()
+        return
+    session = db.session()
+    expire_on_commit = session.expire_on_commit
+    session.expire_on_commit = expire
+    try:
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.expire_on_commit = expire_on_commit
+    for callback in callbacks:
+        callback()
+
+
+@contextmanager
+def unit_of_work():
+    """ Commit the changes saved inside the block at once, roll them all back on an error
+        A unit of work opened inside another one joins it """
+    if in_unit_of_work():
+        g.unit_of_work_depth += 1
+        try:
+            yield
+        finally:
+            g.unit_of_work_depth -= 1
+        return
+
+    begin()
+    try:
+        yield
+    except BaseException:
+        end(success=False)
+        raise
+    end()
+
+
+@event.listens_for(Session, "after_commit")
+def count_commit(session):
+    """ Count the commits of the current request """
+    if has_app_context():
+        g.db_commits = g.get("db_commits", 0) + 1
+
+
+def without_unit_of_work(view):
+    """ Leave the requests of `view` out of the unit of work of the request,
+        for views committing their changes as they go, e.g. an import chunk by chunk """
+    view.unit_of_work_per_request = False
+    return view
+
+
+def init_app(app):
+    """ Wrap every request in a unit of work when UNIT_OF_WORK_PER_REQUEST is set,
+        error responses roll back the changes of the request """
+
+    @app.before_request
+    def begin_request():
+        g.db_commits = 0
+        view = app.view_functions.get(request.endpoint)
+        if config.UNIT_OF_WORK_PER_REQUEST and getattr(view, "unit_of_work_per_request", True):
+            begin()
+
+    @app.after_request
+    def end_request(response):
+        if in_unit_of_work():
+            # nothing reads the models once the response is built
+            end(success=response.status_code < 400, expire=False)
+        commits = g.get("db_commits", 0)
+        logging.debug("%s %s committed %s time(s)", request.method, request.path, commits)
+        if config.DB_COMMIT_HEADER:
+            response.headers["X-DB-Commits"] = str(commits)
+        return response
+
+    @app.teardown_request
+    def abort_request(error=None):
+        # an unhandled error skipped `end_request`
+        if in_unit_of_work():
+            end(success=False)
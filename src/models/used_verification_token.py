@@ -0,0 +1,20 @@
+"""
+Define the UsedVerificationToken model
+"""
+from . import db
+from .abc import BaseModel, MetaBaseModel
+from datetime import datetime
+
+
+class UsedVerificationToken(db.Model, BaseModel, metaclass=MetaBaseModel):
+    """ The UsedVerificationToken model, the redemption of a signed verification token
+        Signed tokens are not stored when issued, only a digest once they are used """
+
+    __tablename__ = "used_verification_tokens"
+    __table_args__ = (
+        db.Index("ix_used_verification_tokens_expires_at", "expires_at"),
+    )
+
+    digest = db.Column(db.String(32), primary_key=True)
+    expires_at = db.Column(db.DateTime(), nullable=False)
+    used_at = db.Column(db.DateTime(), default=datetime.utcnow)
@@ -11,6 +11,12 @@ class VerificationToken(db.Model, BaseModel, metaclass=MetaBaseModel):
     """ The VerificationToken model """
 
     __tablename__ = "verification_tokens"
+    __table_args__ = (
+        db.Index("ix_verification_tokens_token", "token", unique=True),
+        db.Index("ix_verification_tokens_user_id_user_type", "user_id", "user_type"),
+        # the maintenance scheduler purges the expired tokens
+        db.Index("ix_verification_tokens_expires_at", "expires_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     token = db.Column(db.String(200), nullable=False)
@@ -1,2 +1,4 @@
 from .customer import CustomerRepository
+from .signed_verification_token import SignedVerificationTokenRepository
 from .verification_token import VerificationTokenRepository
+from .email_outbox import EmailOutboxRepository
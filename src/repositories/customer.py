@@ -1,16 +1,38 @@
 """ Defines the Customer repository """
+import re
 import sys
-from sqlalchemy import or_, and_
-from models import Customer
-from utils.errors import DataNotFound, DuplicateData, InternalServerError
+from datetime import datetime, timedelta
+
+from sqlalchemy import (Float, Integer, any_, func, inspect, literal, or_, and_, select, tuple_,
+                        union_all, update)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import make_transient_to_detached
+
+import config
+from models import db, Customer, CustomerTombstone
+from models.unit_of_work import after_commit, commit
+from utils.cache import get_cache
+from utils.errors import (DataNotFound, DuplicateData, InternalServerError, InvalidParameter,
+                          PreconditionFailed, ServiceUnavailable)
+from utils.pagination import encode_cursor, decode_cursor
+from utils.password_hasher import password_hasher
 from sqlalchemy.exc import IntegrityError, DataError
 
+# the fields a customer can change with a partial update
+PATCHABLE_FIELDS = ("first_name", "last_name", "phone", "country", "state", "city",
+                    "street_name", "zipcode")
+# the columns cached, the password hash is only read from the database, on a login
+CACHED_COLUMNS = tuple(attr.key for attr in inspect(Customer).column_attrs
+                       if attr.key != "password")
+# cached as ISO 8601 strings, the cache holds JSON values
+DATETIME_COLUMNS = {"created_at", "updated_at"}
+
 
 class CustomerRepository:
     """ The repository for the customer model """
 
-    @staticmethod
-    def get(customer_id=None, username=None, email=None):
+    @classmethod
+    def get(cls, customer_id=None, username=None, email=None):
         """ Query a customer by customer_id """
 
         # make sure one of the parameters was passed
@@ -18,20 +40,92 @@ class CustomerRepository:
             raise DataNotFound(f"Customer not found, no detail provided")
 
         try:
-            query = Customer.query
-            if customer_id:
-                query = query.filter(Customer.id == customer_id)
-            if username:
-                query = query.filter(or_(Customer.username == username, Customer.email == username))
-            if email:
-                query = query.filter(or_(Customer.email == email, Customer.username == email))
-
-            customer = query.first()
-            return customer
+            # lookups by a single detail go through the cache
+            if config.CACHE_ENABLED and [customer_id, username, email].count(None) == 2:
+                return cls._get_cached(customer_id, username or email)
+
+            return cls._query(customer_id, username, email)
         except:
             print(sys.exc_info())
             raise DataNotFound(f"Customer with {customer_id} not found")
 
+    @staticmethod
+    def _login_condition(login):
+        """ Match a login ignoring the case, an email when it has an @ or else a username
+            so the lookup is a single probe of the lower() index of one column """
+        column = Customer.email if "@" in login else Customer.username
+        return func.lower(column) == login.lower()
+
+    @classmethod
+    def _query(cls, customer_id=None, username=None, email=None):
+        query = Customer.query
+        if customer_id:
+            query = query.filter(Customer.id == customer_id)
+        for login in (username, email):
+            if login:
+                query = query.filter(cls._login_condition(login))
+
+        return query.first()
+
+    @classmethod
+    def _get_cached(cls, customer_id=None, login=None):
+        """ Read-through lookup, by id or by a username/email mapped to the id """
+        cache = get_cache(Customer.cache_name)
+        if customer_id is None:
+            customer_id = cache.get(f"login:{login.lower()}")
+            if customer_id is None:
+                return cls._store(cls._query(username=login))
+
+        data = cache.get(f"id:{customer_id}")
+        if data is None:
+            return cls._store(cls._query(customer_id=customer_id))
+        return cls._attach(data)
+
+    @staticmethod
+    def _store(customer):
+        """ Cache the columns of a customer but its password, under its id and its logins """
+        if customer is None:
+            return None
+        data = {column: getattr(customer, column) for column in CACHED_COLUMNS}
+        for column in DATETIME_COLUMNS:
+            if data[column] is not None:
+                data[column] = data[column].isoformat()
+        cache = get_cache(Customer.cache_name)
+        cache.set(f"id:{customer.id}", data)
+        cache.set(f"login:{customer.username.lower()}", customer.id)
+        cache.set(f"login:{customer.email.lower()}", customer.id)
+        return customer
+
+    @staticmethod
+    def _attach(data):
+        """ Return a customer of the session built from cached columns, without a query
+            Its password is not loaded, it is read from the database when first accessed """
+        key = inspect(Customer).identity_key_from_primary_key([data["id"]])
+        customer = db.session.identity_map.get(key)
+        if customer is None:
+            data = dict(data)
+            for column in DATETIME_COLUMNS:
+                if data[column] is not None:
+                    data[column] = datetime.fromisoformat(data[column])
+            customer = Customer(**data)
+            make_transient_to_detached(customer)
+            db.session.add(customer)
+        return customer
+
+    @staticmethod
+    def refresh(customer):
+        """ Reload a customer from the database before changing it
+            A cached copy may hold an older version, which the update would be refused for """
+        db.session.refresh(customer)
+        return customer
+
+    @classmethod
+    def rehash_password(cls, customer, password):
+        """ Hash the password of a customer again with the configured parameters """
+        customer = cls.refresh(customer)
+        customer.set_password(password)
+        return customer.save()
+
     @staticmethod
     def getAll():
         """ Query all customers"""
@@ -39,9 +133,325 @@ class CustomerRepository:
         all_customers = [customer.json for customer in customers]
         return all_customers
 
+    @staticmethod
+    def serializer(fields=None):
+        """ The serializer of the comma separated `fields`, all public fields by default
+            `id` is always included, fields excluded from the json are unknown """
+        serializer = Customer.serializer()
+        if not fields:
+            return serializer
+
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested.difference(serializer.columns)
+        if unknown:
+            raise InvalidParameter(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return serializer.subset(requested | {"id"})
+
+    @classmethod
+    def find(cls, customer_id, fields=None):
+        """ Query the `fields` of a customer by customer_id
+            Only the requested columns are selected, without loading the model
+            Return the customer, its version and the time it was last updated """
+        serializer = cls.serializer(fields)
+        row = db.session.query(*serializer.attributes, Customer.version, Customer.updated_at) \
+            .filter(Customer.id == customer_id).first()
+        if row is None:
+            raise DataNotFound(f"Customer with {customer_id} not found")
+        return (serializer.dump_row(row[:-2]), *row[-2:])
+
+    @classmethod
+    def find_many(cls, customer_ids, fields=None):
+        """ Query the `fields` of many customers at once, in a single query
+            Return the customers in the order of `customer_ids` and the ids not found """
+        serializer = cls.serializer(fields)
+        customer_ids = list(dict.fromkeys(customer_ids))
+        if db.engine.dialect.name == "postgresql":
+            # a single array parameter, the statement is the same for any number of ids
+            condition = Customer.id == any_(literal(customer_ids, ARRAY(Integer)))
+        else:
+            condition = Customer.id.in_(customer_ids)
+        rows = db.session.query(*serializer.attributes).filter(condition).all()
+
+        found = {customer["id"]: customer for customer in map(serializer.dump_row, rows)}
+        customers = [found[customer_id] for customer_id in customer_ids if customer_id in found]
+        missing = [customer_id for customer_id in customer_ids if customer_id not in found]
+        return customers, missing
+
+    @classmethod
+    def search(cls, text, limit, fields=None):
+        """ Query the customers with a first_name, last_name, email or phone containing `text`
+            On Postgres similar values match too, ranked by their trigram distance """
+        serializer = cls.serializer(fields)
+        columns = [Customer.first_name, Customer.last_name, Customer.email, Customer.phone]
+        pattern = "%" + re.sub(r"([/%_])", r"/\1", text) + "%"
+
+        query = db.session.query(*serializer.attributes)
+        if db.engine.dialect.name != "postgresql":
+            condition = or_(*[column.ilike(pattern, escape="/") for column in columns])
+            rows = query.filter(condition).order_by(Customer.id).limit(limit).all()
+            return [serializer.dump_row(row) for row in rows]
+
+        # the `limit` nearest values of each column and condition are read from the GiST
+        # indexes in distance order, the best `limit` of them are the nearest customers
+        candidates = []
+        for column in columns:
+            distance = column.op("<->", return_type=Float)(text)
+            for condition in (column.op("%")(text), column.ilike(pattern, escape="/")):
+                candidates.append(
+                    select(Customer.id.label("id"), distance.label("distance"))
+                    .where(condition).order_by(distance).limit(limit)
+                )
+        candidates = union_all(*candidates).subquery()
+        nearest = (
+            select(candidates.c.id, func.min(candidates.c.distance).label("distance"))
+            .group_by(candidates.c.id)
+            .subquery()
+        )
+
+        rows = (
+            query.join(nearest, nearest.c.id == Customer.id)
+            .order_by(nearest.c.distance, Customer.id)
+            .limit(limit)
+            .all()
+        )
+        return [serializer.dump_row(row) for row in rows]
+
+    @staticmethod
+    def get_version(customer_id):
+        """ Query only the version of a customer and the time it was last updated,
+            to answer conditional requests """
+        row = db.session.query(Customer.version, Customer.updated_at) \
+            .filter(Customer.id == customer_id).first()
+        if row is None:
+            raise DataNotFound(f"Customer with {customer_id} not found")
+        return tuple(row)
+
+    @staticmethod
+    def _page(columns, limit, after=None, country=None, state=None, city=None):
+        """ Query the `columns` of a page of customers ordered by id,
+            starting after the `after` cursor
+            Return the rows of the page and the cursor of the next page """
+        query = db.session.query(*columns)
+        if country:
+            query = query.filter(Customer.country == country)
+        if state:
+            query = query.filter(Customer.state == state)
+        if city:
+            query = query.filter(Customer.city == city)
+        if after:
+            last_id = decode_cursor(after).get("id")
+            if not isinstance(last_id, int):
+                raise InvalidParameter("The cursor provided is not valid")
+            query = query.filter(Customer.id > last_id)
+
+        # fetch one extra row to know if there is a next page without a COUNT
+        rows = query.order_by(Customer.id).limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor({"id": rows[-1].id})
+        return rows, next_cursor
+
+    @classmethod
+    def get_page(cls, limit, fields=None, **filters):
+        """ Query a page of customers, see `_page` for the filters
+            Return the customers, the cursor of the next page and the versions of the page """
+        serializer = cls.serializer(fields)
+        rows, next_cursor = cls._page([*serializer.attributes, Customer.version],
+                                      limit, **filters)
+        customers = [serializer.dump_row(row[:-1]) for row in rows]
+        versions = [(customer["id"], row[-1]) for customer, row in zip(customers, rows)]
+        return customers, next_cursor, versions
+
+    @classmethod
+    def get_page_versions(cls, limit, **filters):
+        """ Query only the versions of a page of customers, to answer conditional requests
+            Return the versions and whether a next page follows """
+        rows, next_cursor = cls._page([Customer.id, Customer.version], limit, **filters)
+        return [tuple(row) for row in rows], next_cursor is not None
+
+    @staticmethod
+    def _changes_after(columns, time_column, id_column, position, horizon, limit):
+        """ Query the `columns` of `limit` changes after `position`, up to `horizon`,
+            followed by the id and the time of the change
+            Return the rows and whether more changes follow """
+        query = db.session.query(*columns, id_column, time_column).filter(time_column <= horizon)
+        if position:
+            try:
+                changed_at, last_id = datetime.fromisoformat(position[0]), int(position[1])
+            except (TypeError, ValueError, IndexError):
+                raise InvalidParameter("The cursor provided is not valid")
+            query = query.filter(tuple_(time_column, id_column) > tuple_(changed_at, last_id))
+
+        rows = query.order_by(time_column, id_column).limit(limit + 1).all()
+        return rows[:limit], len(rows) > limit
+
+    @classmethod
+    def changes(cls, limit, since=None, fields=None):
+        """ Query the customers changed and deleted after the `since` cursor, oldest first
+            Changes of the last CHANGES_LAG seconds are left for the next call,
+            transactions still running may commit changes dated before them
+            Return the customers, the ids deleted, the next cursor and whether more follow """
+        serializer = cls.serializer(fields)
+        position = decode_cursor(since) if since else {}
+        horizon = datetime.utcnow() - timedelta(seconds=config.CHANGES_LAG)
+
+        updated, more_updated = cls._changes_after(
+            serializer.attributes, Customer.updated_at, Customer.id,
+            position.get("u"), horizon, limit
+        )
+        deleted, more_deleted = cls._changes_after(
+            [], CustomerTombstone.deleted_at, CustomerTombstone.customer_id,
+            position.get("d"), horizon, limit
+        )
+
+        # the cursor holds the last change read from each feed
+        if updated:
+            position["u"] = [updated[-1][-1].isoformat(), updated[-1][-2]]
+        if deleted:
+            position["d"] = [deleted[-1][-1].isoformat(), deleted[-1][-2]]
+        customers = [serializer.dump_row(row[:-2]) for row in updated]
+        return (customers, [row[0] for row in deleted], encode_cursor(position),
+                more_updated or more_deleted)
+
+    @staticmethod
+    def purge_tombstones(batch_size):
+        """ Delete the tombstones older than TOMBSTONE_RETENTION, `batch_size` rows per
+            transaction, never those still behind the horizon of the change feed
+            Return the number of tombstones deleted """
+        retention = max(config.TOMBSTONE_RETENTION, config.CHANGES_LAG)
+        cutoff = datetime.utcnow() - timedelta(seconds=retention)
+        total = 0
+        while True:
+            expired = (
+                db.session.query(CustomerTombstone.customer_id)
+                .filter(CustomerTombstone.deleted_at < cutoff)
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            deleted = CustomerTombstone.query \
+                .filter(CustomerTombstone.customer_id.in_(expired)) \
+                .delete(synchronize_session=False)
+            db.session.commit()
+            total += deleted
+            if deleted < batch_size:
+                return total
+
+    @staticmethod
+    def stream(columns, batch_size):
+        """ Iterate over every customer as plain rows of `columns`
+            Rows are read through a server-side cursor, `batch_size` at a time,
+            so memory does not grow with the table """
+        query = (
+            db.session.query(*[getattr(Customer, column) for column in columns])
+            .order_by(Customer.id)
+            .execution_options(stream_results=True)
+            .yield_per(batch_size)
+        )
+        for row in query:
+            yield row
+
+    @classmethod
+    def patch(cls, customer_id, changes, expected_version=None, fields=None):
+        """ Update the `changes` of a customer with a single UPDATE ... RETURNING
+            The version is bumped and `updated_at` set by the same statement
+            With `expected_version` only that version of the customer is updated
+            Return the customer, its version and the time it was last updated """
+        unknown = set(changes).difference(PATCHABLE_FIELDS)
+        if unknown:
+            raise InvalidParameter(f"Fields that cannot be updated: {', '.join(sorted(unknown))}")
+        if not changes:
+            raise InvalidParameter("No fields to update")
+
+        serializer = cls.serializer(fields)
+        condition = Customer.id == customer_id
+        if expected_version is not None:
+            condition = and_(condition, Customer.version == expected_version)
+        statement = (
+            update(Customer)
+            .where(condition)
+            .values(**changes, version=Customer.version + 1, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        columns = [*serializer.attributes, Customer.version, Customer.updated_at]
+
+        try:
+            if db.engine.dialect.full_returning:
+                row = db.session.execute(statement.returning(*columns)).first()
+            else:
+                # without RETURNING, read the row back in the same transaction
+                updated = db.session.execute(statement).rowcount
+                row = db.session.query(*columns).filter(Customer.id == customer_id).first() \
+                    if updated else None
+        except DataError as e:
+            db.session.rollback()
+            raise InvalidParameter(str(e.orig).strip())
+
+        if row is None:
+            db.session.rollback()
+            # only a failed update pays for telling a missing customer from a stale version
+            exists = db.session.query(Customer.id).filter(Customer.id == customer_id).first()
+            if exists is None:
+                raise DataNotFound(f"Customer with {customer_id} not found")
+            raise PreconditionFailed("The customer was modified, get its last version first")
+
+        commit()
+        after_commit(lambda: get_cache(Customer.cache_name).delete(f"id:{customer_id}"))
+        return (serializer.dump_row(row[:-2]), *row[-2:])
+
+    @staticmethod
+    def bulk_create(customers):
+        """ Insert a chunk of new customers in one transaction, each with a `password`
+            to hash or an already hashed `password_hash`
+            Customers with a username or an email already taken are skipped
+            Return the positions in `customers` of the skipped customers """
+        table = Customer.__table__
+        now = datetime.utcnow()
+        columns = [column.key for column in table.columns if column.key != "id"]
+        defaults = dict.fromkeys(columns, None)
+        defaults.update(created_at=now, updated_at=now, version=1)
+
+        # duplicates inside the chunk are skipped before reaching the database
+        rows, positions, seen = [], [], set()
+        for position, customer in enumerate(customers):
+            logins = (customer["username"].lower(), customer["email"].lower())
+            if seen.intersection(logins):
+                continue
+            seen.update(logins)
+            row = dict(defaults, **customer)
+            row["password"] = row.pop("password_hash", None) or row["password"]
+            rows.append(row)
+            positions.append(position)
+
+        # the passwords of the chunk are hashed together over the hashing workers
+        plain = [row for row, customer in zip(rows, (customers[p] for p in positions))
+                 if "password_hash" not in customer]
+        for row, pwhash in zip(plain, password_hasher.hash_many([row["password"] for row in plain])):
+            row["password"] = pwhash
+
+        inserted = set()
+        if rows and db.engine.dialect.name == "postgresql":
+            # a single multi-row INSERT, conflicting rows are not returned
+            statement = pg_insert(table).values(rows).on_conflict_do_nothing() \
+                .returning(table.c.username)
+            inserted.update(row.username for row in db.session.execute(statement))
+        else:
+            for row in rows:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(table.insert().values(row))
+                    inserted.add(row["username"])
+                except IntegrityError:
+                    pass
+        commit()
+
+        created = {position for position, row in zip(positions, rows)
+                   if row["username"] in inserted}
+        return [position for position in range(len(customers)) if position not in created]
+
     def update(self, customer_id, **args):
         """ Update a customer's age """
-        customer = self.get(customer_id)
+        customer = self.refresh(self.get(customer_id))
         if 'phone' in args and args['phone'] is not None:
             customer.phone = args['phone']
 
@@ -57,6 +467,9 @@ class CustomerRepository:
     def create(username, last_name, first_name, email, password, phone=None, country=None,
                state=None, city=None, street_name=None, zipcode=None):
         """ Create a new customer """
+        # a login with an @ is looked up as an email
+        if "@" in username:
+            raise InvalidParameter("The username cannot contain @")
         try:
             new_customer = Customer(username=username, first_name=first_name, last_name=last_name,
                                     email=email, phone=phone, country=country, state=state, city=city,
@@ -67,5 +480,7 @@ class CustomerRepository:
         except IntegrityError as e:
             message = e.orig.diag.message_detail
             raise DuplicateData(message)
+        except ServiceUnavailable:
+            raise
         except Exception:
             raise InternalServerError
@@ -0,0 +1,65 @@
+""" Defines the EmailOutbox repository """
+from datetime import datetime, timedelta
+
+from config import EMAIL_SENDER_NAME, EMAIL_SENDER_EMAIL
+from models import db, EmailOutbox
+
+
+class EmailOutboxRepository:
+    """ The repository for the email_outbox model """
+
+    @staticmethod
+    def enqueue(to, subject, message, sender=None):
+        """ Queue an email for the outbox worker """
+        if sender is None:
+            sender = {
+                'name': EMAIL_SENDER_NAME,
+                'email': EMAIL_SENDER_EMAIL,
+            }
+        email = EmailOutbox(sender_email=sender['email'], sender_name=sender['name'],
+                            recipient_email=to['email'], recipient_name=to['name'],
+                            subject=subject, html=message)
+        return email.save()
+
+    @staticmethod
+    def claim(limit, lease):
+        """ Claim up to `limit` pending emails that are due
+            Claimed emails are pushed `lease` seconds in the future, so other workers
+            skip them, and are retried if this worker dies before reporting them """
+        now = datetime.utcnow()
+        emails = (
+            EmailOutbox.query
+            .filter(EmailOutbox.status == EmailOutbox.PENDING, EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for email in emails:
+            email.attempts += 1
+            email.next_attempt_at = now + timedelta(seconds=lease)
+            email.updated_at = now
+        db.session.commit()
+        return emails
+
+    @staticmethod
+    def mark_sent(email):
+        """ Record the delivery of an email """
+        now = datetime.utcnow()
+        email.status = EmailOutbox.SENT
+        email.sent_at = now
+        email.updated_at = now
+        email.last_error = None
+
+    @staticmethod
+    def mark_failed(email, error, max_attempts, backoff, max_backoff):
+        """ Schedule the next attempt of an email with an exponential backoff
+            or give up on it after `max_attempts` """
+        now = datetime.utcnow()
+        email.last_error = error
+        email.updated_at = now
+        if email.attempts >= max_attempts:
+            email.status = EmailOutbox.FAILED
+            return
+        delay = min(backoff * 2 ** (email.attempts - 1), max_backoff)
+        email.next_attempt_at = now + timedelta(seconds=delay)
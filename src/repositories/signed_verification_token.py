@@ -0,0 +1,77 @@
+""" Defines the repository of the signed verification tokens """
+import hashlib
+import time
+from datetime import datetime
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy.exc import IntegrityError
+
+import config
+from models import db, UsedVerificationToken
+from utils.errors import DataNotFound
+
+
+class SignedVerificationTokenRepository:
+    """ Stateless verification tokens, signed with the SECRET_KEY
+        The token carries its user, channel and expiry so checking it needs no query """
+
+    salt = "verification-token"
+
+    @classmethod
+    def _serializer(cls):
+        return URLSafeTimedSerializer(config.SECRET_KEY, salt=cls.salt)
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
+
+    @classmethod
+    def create(cls, user_id, user_type, channel, expires_in=None):
+        """ Create a new token, nothing is written to the database """
+        expires_in = expires_in or config.VERIFICATION_TOKEN_EXPIRY * 60
+        payload = {"u": user_id, "t": user_type, "c": channel, "e": int(time.time()) + expires_in}
+        return cls._serializer().dumps(payload)
+
+    @classmethod
+    def verify(cls, token):
+        """ Check the signature and expiry of a token and return its claims """
+        try:
+            payload = cls._serializer().loads(token)
+        except BadSignature:
+            raise DataNotFound("VerificationToken not found")
+        if payload["e"] < time.time():
+            raise DataNotFound("VerificationToken expired")
+        return {"user_id": payload["u"], "user_type": payload["t"], "channel": payload["c"],
+                "expires_at": datetime.utcfromtimestamp(payload["e"])}
+
+    @classmethod
+    def redeem(cls, token):
+        """ Verify a token and record it as used, a token can only be redeemed once """
+        claims = cls.verify(token)
+        used = UsedVerificationToken(digest=cls._digest(token), expires_at=claims["expires_at"])
+        try:
+            used.save()
+        except IntegrityError:
+            db.session.rollback()
+            raise DataNotFound("VerificationToken already used")
+        return claims
+
+    @staticmethod
+    def purge_expired(batch_size):
+        """ Delete the records of the used tokens that expired, they can no longer be replayed
+            `batch_size` rows per transaction, return the number of records deleted """
+        total = 0
+        while True:
+            expired = (
+                db.session.query(UsedVerificationToken.digest)
+                .filter(UsedVerificationToken.expires_at < datetime.utcnow())
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            deleted = UsedVerificationToken.query \
+                .filter(UsedVerificationToken.digest.in_(expired)) \
+                .delete(synchronize_session=False)
+            db.session.commit()
+            total += deleted
+            if deleted < batch_size:
+                return total
@@ -2,9 +2,19 @@
 from datetime import datetime, timedelta
 
 from sqlalchemy import or_, and_
-from models import VerificationToken
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
+
+import config
+from models import db, VerificationToken
+from models.unit_of_work import commit
 from utils.utilities import generate_token
 from utils.errors import DataNotFound, ResourceNotCreated
+from .signed_verification_token import SignedVerificationTokenRepository
+
+# tokens drawn before giving up, a collision of 16 random bytes is already unlikely
+CREATE_ATTEMPTS = 5
 
 
 class VerificationTokenRepository:
@@ -19,10 +29,10 @@ class VerificationTokenRepository:
             raise DataNotFound(f"VerificationToken not found, some details not provided")
 
         query = VerificationToken.query.filter(VerificationToken.token == token,
-                                               VerificationToken.user_id == user_type,
+                                               VerificationToken.user_id == user_id,
                                                VerificationToken.user_type == user_type)
         if status is not None:
-            query.filter(VerificationToken.used_status == status)
+            query = query.filter(VerificationToken.used_status == status)
 
         return query.first()
 
@@ -38,23 +48,93 @@ class VerificationTokenRepository:
 
         return token.save()
 
-    @classmethod
-    def create(cls, user_id, user_type, email, phone, length=16):
-        """ Create a new token """
-        token = generate_token(length)
-        existing_token = cls.get(token=token, user_id=user_id, user_type=user_type)
-        while existing_token:
+    @staticmethod
+    def create(user_id, user_type, email, phone, length=16):
+        """ Create a new token
+            The unique index on `token` rejects collisions, no query checks them first """
+        now = datetime.now()
+        expiry = now + timedelta(minutes=config.VERIFICATION_TOKEN_EXPIRY)
+        values = dict(user_id=user_id, user_type=user_type, email_token=email, phone_token=phone,
+                      used_status=False, expires_at=expiry, created_at=now, updated_at=now)
+        postgres = db.engine.dialect.name == "postgresql"
+
+        for _ in range(CREATE_ATTEMPTS):
             token = generate_token(length)
-            exsiting_token = cls.get(token=token, user_id=user_id, user_type=user_type)
-
-        expiry = datetime.now() + timedelta(minutes=10)
-
-        try:
-            new_token = VerificationToken(token=token, user_id=user_id, user_type=user_type,
-                                          expires_at=expiry, email_token=email, phone_token=phone
-                                          )
-        except DataError as e:
-            pass
-        except:
-            raise ResourceNotCreated(f"VerificationToken not created")
-        return new_token
+            if postgres:
+                statement = (
+                    insert(VerificationToken)
+                    .values(token=token, **values)
+                    .on_conflict_do_nothing(index_elements=["token"])
+                    .returning(VerificationToken.id)
+                )
+                token_id = db.session.execute(statement).scalar()
+                if token_id is None:
+                    continue
+                commit()
+                # the row is known, attach it to the session without reading it back
+                new_token = VerificationToken(id=token_id, token=token, **values)
+                make_transient_to_detached(new_token)
+                db.session.add(new_token)
+                return new_token
+
+            new_token = VerificationToken(token=token, **values)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(new_token)
+            except IntegrityError:
+                continue
+            commit()
+            return new_token
+
+        raise ResourceNotCreated(f"VerificationToken not created")
+
+    @staticmethod
+    def purge_expired(batch_size):
+        """ Delete the expired tokens, `batch_size` rows per transaction
+            Return the number of tokens deleted """
+        total = 0
+        while True:
+            expired = (
+                db.session.query(VerificationToken.id)
+                .filter(VerificationToken.expires_at < datetime.now())
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            deleted = VerificationToken.query.filter(VerificationToken.id.in_(expired)) \
+                .delete(synchronize_session=False)
+            db.session.commit()
+            total += deleted
+            if deleted < batch_size:
+                return total
+
+    @classmethod
+    def issue(cls, user_id, user_type, channel):
+        """ Issue a token for the `email` or `phone` channel of a user
+            in the VERIFICATION_TOKEN_MODE, return the token to send to the user """
+        if config.VERIFICATION_TOKEN_MODE == "signed":
+            return SignedVerificationTokenRepository.create(user_id, user_type, channel)
+
+        token = cls.create(user_id=user_id, user_type=user_type,
+                           email=channel == "email", phone=channel == "phone")
+        return token.token
+
+    @staticmethod
+    def redeem(token):
+        """ Mark a token issued by `issue` as used and return who it was issued to """
+        if config.VERIFICATION_TOKEN_MODE == "signed":
+            return SignedVerificationTokenRepository.redeem(token)
+
+        verification_token = VerificationToken.query.filter(
+            VerificationToken.token == token,
+            VerificationToken.used_status.is_(False),
+            VerificationToken.expires_at > datetime.now(),
+        ).first()
+        if verification_token is None:
+            raise DataNotFound(f"VerificationToken not found")
+
+        verification_token.used_status = True
+        verification_token.expires_at = datetime.now()
+        verification_token.updated_at = datetime.now()
+        verification_token.save()
+        return {"user_id": verification_token.user_id, "user_type": verification_token.user_type,
+                "channel": "email" if verification_token.email_token else "phone"}
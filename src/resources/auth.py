@@ -1,15 +1,17 @@
 """
 Define the resources for the customer, vendor and admin auth
 """
+import logging
 import sys
 
 from flask import jsonify, abort
-from flasgger import swag_from
 from flask_restful import Resource
 from flask_restful.reqparse import Argument
-from repositories import CustomerRepository, VerificationTokenRepository
-from utils import parse_params, Notification
-from utils.errors import DataNotFound, DuplicateData
+from models.unit_of_work import unit_of_work
+from repositories import CustomerRepository, VerificationTokenRepository, EmailOutboxRepository
+from utils import parse_params
+from utils.errors import DataNotFound, DuplicateData, ServiceUnavailable
+from utils.docs import swag_from
 
 
 class AuthResource(Resource):
@@ -28,14 +30,23 @@ class AuthResource(Resource):
 
         try:
             customer = CustomerRepository.get(username=username)
-            print(customer)
-            if not customer.check_password(password):
-                abort(401, "Username or Password is incorrect")
-            return jsonify({"data": customer.json})
+            authenticated = customer is not None and customer.check_password(password)
         except DataNotFound:
+            authenticated = False
+        except ServiceUnavailable as e:
+            abort(e.code, e.message)
+
+        if not authenticated:
             abort(401, "Username or Password is incorrect")
-        except:
-            abort(500)
+
+        # upgrade hashes made with outdated parameters while we have the password
+        if customer.password_needs_rehash():
+            try:
+                customer = CustomerRepository.rehash_password(customer, password)
+            except ServiceUnavailable:
+                logging.warning("password rehash of customer %s postponed", customer.id)
+
+        return jsonify({"data": customer.json})
 
     @staticmethod
     @parse_params(
@@ -59,30 +70,34 @@ class AuthResource(Resource):
 
         # TODO: validate inputs very well
         try:
-            # customer = CustomerRepository.create(email=email, password=password, username=username,
-            #                                      first_name=first_name, last_name=last_name,
-            #                                      phone=phone)
-
-            customer = CustomerRepository.get(customer_id=26)
-            # create verification tokens for the email and phone
-            email_token = VerificationTokenRepository.create(user_id=customer.id,
-                                                             user_type="customer", email=True,
-                                                             phone=False)
-
-            # create email template for verification token
-            email_confirm_url = f"{confirm_url}/{email_token}"
-            email_notification = Notification(email=True)
-            email_message = email_notification.create_email_template("user_verification_email.html",
-                                                                     confirm_url=email_confirm_url,
-                                                                     customer=customer)
-
-            # send email verification notification
-            recipient = {
-                "name": f"{customer.first_name} {customer.last_name}",
-                "email": customer.email
-            }
-            subject = "Customer Email Verification"
-            Notification.send_email(message=email_message, to=recipient, subject=subject)
+            # the templates are only loaded by the processes registering customers
+            from utils.notification_sender import Notification
+
+            # the customer, its token and its email are committed together or not at all
+            with unit_of_work():
+                # customer = CustomerRepository.create(email=email, password=password,
+                #                                      username=username, first_name=first_name,
+                #                                      last_name=last_name, phone=phone)
+
+                customer = CustomerRepository.get(customer_id=26)
+                # create verification tokens for the email and phone
+                email_token = VerificationTokenRepository.issue(user_id=customer.id,
+                                                                user_type="customer", channel="email")
+
+                # create email template for verification token
+                email_confirm_url = f"{confirm_url}/{email_token}"
+                email_notification = Notification(email=True)
+                email_message = email_notification.create_email_template("user_verification_email.html",
+                                                                         confirm_url=email_confirm_url,
+                                                                         customer=customer)
+
+                # queue the email verification notification for the outbox worker
+                recipient = {
+                    "name": f"{customer.first_name} {customer.last_name}",
+                    "email": customer.email
+                }
+                subject = "Customer Email Verification"
+                EmailOutboxRepository.enqueue(message=email_message, to=recipient, subject=subject)
 
             return jsonify({"data": customer.json})
         except DuplicateData as e:
@@ -90,3 +105,19 @@ class AuthResource(Resource):
         except Exception as e:
             print(sys.exc_info())
             abort(500, e)
+
+    @staticmethod
+    @parse_params(
+        Argument("token", required=True, location="json",
+                 help="The verification token sent to the customer."),
+    )
+    @swag_from("../swagger/auth/verify_token.yml")
+    def verify_token(token):
+        """ Redeem a verification token and return who it was issued to """
+        try:
+            claims = VerificationTokenRepository.redeem(token)
+        except DataNotFound as e:
+            abort(e.code, e.message)
+
+        return jsonify({"data": {"user_id": claims["user_id"], "user_type": claims["user_type"],
+                                 "channel": claims["channel"]}})
@@ -1,38 +1,266 @@
 """
 Define the resources for the customers
 """
-from flask import jsonify, abort
-from flasgger import swag_from
+from itertools import islice
+
+from flask import Response, jsonify, abort, request, stream_with_context
 from flask_restful import Resource
 from flask_restful.reqparse import Argument
+
+import config
+from models import Customer
+from models.unit_of_work import without_unit_of_work
 from repositories import CustomerRepository
+from repositories.customer import PATCHABLE_FIELDS
 from utils import parse_params
-from utils.errors import DataNotFound
+from utils.errors import DataNotFound, InvalidParameter, PreconditionFailed, ServiceUnavailable
+from utils.conditional import (if_match_version, is_conditional, make_etag, not_modified,
+                               not_modified_response, set_validators)
+from utils.export import EXPORT_FORMATS, IMPORT_FORMATS
+from utils.docs import swag_from
+from validators import validate_customer
+
+
+def _find_many(customer_ids, fields=None):
+    """ Respond with the customers of `customer_ids`, in their order, and the ids not found """
+    if not customer_ids:
+        abort(400, "No ids provided")
+    if len(customer_ids) > config.BATCH_MAX_IDS:
+        abort(400, f"At most {config.BATCH_MAX_IDS} ids can be requested at once")
+
+    try:
+        customers, missing = CustomerRepository.find_many(customer_ids, fields=fields)
+    except InvalidParameter as e:
+        abort(e.code, e.message)
+    return jsonify({"data": customers, "missing": missing})
 
 
 class CustomerResource(Resource):
     """ methods relative to the customer """
 
     @staticmethod
+    @parse_params(
+        Argument("fields", location="args",
+                 help="The comma separated fields of the customer to return."),
+    )
     @swag_from("../swagger/customer/get_one.yml")
-    def get_one(customer_id):
+    def get_one(customer_id, fields=None):
         """ Return a customer key information based on customer_id """
 
         try:
-            customer = CustomerRepository.get(customer_id=customer_id)
-            return jsonify({"data": customer.json})
+            # a client revalidating its copy only costs a version query
+            if is_conditional():
+                version, updated_at = CustomerRepository.get_version(customer_id)
+                etag = make_etag("customer", customer_id, fields, version=version)
+                if not_modified(etag, updated_at):
+                    return not_modified_response(etag, updated_at)
+
+            customer, version, updated_at = CustomerRepository.find(customer_id, fields=fields)
         except DataNotFound as e:
             abort(404, e.message)
-        except Exception:
-            abort(500)
+        except InvalidParameter as e:
+            abort(e.code, e.message)
+
+        response = jsonify({"data": customer})
+        etag = make_etag("customer", customer_id, fields, version=version)
+        return set_validators(response, etag, updated_at)
 
     @staticmethod
+    @parse_params(
+        *[Argument(field, location="json", store_missing=False,
+                   help=f"The {field} of the customer.") for field in PATCHABLE_FIELDS],
+        Argument("version", type=int, location="json",
+                 help="The version of the customer being modified, instead of If-Match."),
+        Argument("fields", location="args",
+                 help="The comma separated fields of the customer to return."),
+    )
+    @swag_from("../swagger/customer/patch.yml")
+    def patch(customer_id, version=None, fields=None, **changes):
+        """ Update some fields of a customer, only if it is still at the expected version """
+        # reqparse drops the keys it was not told about, they are refused instead
+        body = request.get_json(silent=True)
+        unknown = set(body if isinstance(body, dict) else ()).difference(PATCHABLE_FIELDS,
+                                                                          ("version",))
+        if unknown:
+            abort(400, f"Fields that cannot be updated: {', '.join(sorted(unknown))}")
+
+        expected_version = if_match_version()
+        if expected_version is None:
+            expected_version = version
+
+        try:
+            customer, version, updated_at = CustomerRepository.patch(
+                customer_id, changes, expected_version=expected_version, fields=fields
+            )
+        except (DataNotFound, InvalidParameter, PreconditionFailed) as e:
+            abort(e.code, e.message)
+
+        response = jsonify({"data": customer})
+        etag = make_etag("customer", customer_id, fields, version=version)
+        return set_validators(response, etag, updated_at)
+
+    @staticmethod
+    @parse_params(
+        Argument("limit", type=int, location="args", default=config.PAGE_SIZE_DEFAULT,
+                 help="The number of customers per page."),
+        Argument("after", location="args",
+                 help="The next_cursor returned with the previous page."),
+        Argument("country", location="args", help="The country of the customers."),
+        Argument("state", location="args", help="The state of the customers."),
+        Argument("city", location="args", help="The city of the customers."),
+        Argument("fields", location="args",
+                 help="The comma separated fields of the customers to return."),
+        Argument("ids", location="args",
+                 help="The comma separated ids of the customers to return, instead of a page."),
+    )
     @swag_from("../swagger/customer/get_all.yml")
-    def get_all():
-        """ Return all customer key information based on the query parameter """
-        customers = CustomerRepository.getAll()
+    def get_all(limit, after=None, country=None, state=None, city=None, fields=None, ids=None):
+        """ Return a page of customers key information based on the query parameters """
+        if ids is not None:
+            try:
+                customer_ids = [int(customer_id) for customer_id in ids.split(",") if customer_id]
+            except ValueError:
+                abort(400, "The ids must be comma separated integers")
+            return _find_many(customer_ids, fields)
+
+        limit = max(1, min(limit, config.PAGE_SIZE_MAX))
+        filters = dict(after=after, country=country, state=state, city=city)
+        # the page is identified by its parameters, its version by the versions of its rows
+        # and by whether a next page follows, rows added after a last page change its cursor
+        page = ("customers", sorted(request.args.items(multi=True)))
+        try:
+            if is_conditional():
+                versions, has_more = CustomerRepository.get_page_versions(limit, **filters)
+                etag = make_etag(page, versions, has_more)
+                if not_modified(etag):
+                    return not_modified_response(etag)
+
+            customers, next_cursor, versions = CustomerRepository.get_page(
+                limit, fields=fields, **filters
+            )
+        except InvalidParameter as e:
+            abort(e.code, e.message)
+
+        response = jsonify({"data": customers, "next_cursor": next_cursor})
+        return set_validators(response, make_etag(page, versions, next_cursor is not None))
+
+    @staticmethod
+    @parse_params(
+        Argument("since", location="args",
+                 help="The next_cursor returned by the previous call, none for every customer."),
+        Argument("limit", type=int, location="args", default=config.PAGE_SIZE_DEFAULT,
+                 help="The number of changes per page."),
+        Argument("fields", location="args",
+                 help="The comma separated fields of the customers to return."),
+    )
+    @swag_from("../swagger/customer/changes.yml")
+    def changes(limit, since=None, fields=None):
+        """ Return the customers changed and deleted since the cursor, oldest first """
+        limit = max(1, min(limit, config.PAGE_SIZE_MAX))
+        try:
+            customers, deleted, next_cursor, has_more = CustomerRepository.changes(
+                limit, since=since, fields=fields
+            )
+        except InvalidParameter as e:
+            abort(e.code, e.message)
+
+        return jsonify({"data": customers, "deleted": deleted, "next_cursor": next_cursor,
+                        "has_more": has_more})
+
+    @staticmethod
+    @parse_params(
+        Argument("q", dest="text", location="args", required=True,
+                 help="The part of a name, email or phone to look for."),
+        Argument("limit", type=int, location="args", default=config.PAGE_SIZE_DEFAULT,
+                 help="The number of customers to return."),
+        Argument("fields", location="args",
+                 help="The comma separated fields of the customers to return."),
+    )
+    @swag_from("../swagger/customer/search.yml")
+    def search(text, limit, fields=None):
+        """ Return the customers best matching a part of their name, email or phone """
+        text = text.strip()
+        if len(text) < config.SEARCH_MIN_LENGTH:
+            abort(400, f"Search at least {config.SEARCH_MIN_LENGTH} characters")
+        limit = max(1, min(limit, config.PAGE_SIZE_MAX))
+
+        try:
+            customers = CustomerRepository.search(text, limit, fields=fields)
+        except InvalidParameter as e:
+            abort(e.code, e.message)
         return jsonify({"data": customers})
 
+    @staticmethod
+    @parse_params(
+        Argument("ids", type=int, action="append", location="json", required=True,
+                 help="The ids of the customers to return."),
+        Argument("fields", location="json",
+                 help="The comma separated fields of the customers to return."),
+    )
+    @swag_from("../swagger/customer/batch.yml")
+    def batch(ids, fields=None):
+        """ Return many customers at once, for lists of ids too long for a query string """
+        return _find_many(ids, fields)
+
+    @staticmethod
+    @parse_params(
+        Argument("format", dest="export_format", location="args", default="ndjson",
+                 choices=tuple(EXPORT_FORMATS), help="The format of the export, ndjson or csv."),
+    )
+    @swag_from("../swagger/customer/export.yml")
+    def export(export_format):
+        """ Stream every customer as NDJSON or CSV """
+        mimetype, encode = EXPORT_FORMATS[export_format]
+        serializer = Customer.serializer()
+        rows = CustomerRepository.stream(serializer.columns, batch_size=config.EXPORT_BATCH_SIZE)
+
+        response = Response(stream_with_context(encode(serializer, rows)), mimetype=mimetype)
+        response.headers["Content-Disposition"] = f"attachment; filename=customers.{export_format}"
+        return response
+
+    @staticmethod
+    @without_unit_of_work
+    @swag_from("../swagger/customer/import.yml")
+    def import_customers():
+        """ Create the customers of an NDJSON or CSV upload, chunk by chunk
+            Each chunk is committed on its own, a failure keeps the chunks already created
+            Lines not valid or already existing are reported, the others are created """
+        upload = request.files.get("file")
+        mimetype = upload.mimetype if upload else request.mimetype
+        if mimetype not in IMPORT_FORMATS:
+            abort(400, f"The upload must be one of {', '.join(IMPORT_FORMATS)}")
+
+        # the upload is read line by line, only a chunk is held in memory at a time
+        records = IMPORT_FORMATS[mimetype](upload.stream if upload else request.stream)
+        received, created, errors = 0, 0, []
+        while True:
+            chunk = list(islice(records, config.IMPORT_CHUNK_SIZE))
+            if not chunk:
+                break
+            received += len(chunk)
+
+            customers, lines = [], []
+            for line, record in chunk:
+                customer, error = validate_customer(record) if record is not None \
+                    else (None, "The line is not valid JSON")
+                if error:
+                    errors.append({"line": line, "error": error})
+                    continue
+                customers.append(customer)
+                lines.append(line)
+
+            try:
+                duplicates = CustomerRepository.bulk_create(customers)
+            except ServiceUnavailable as e:
+                abort(e.code, f"{e.message}, the {created} customers of the lines before "
+                              f"line {chunk[0][0]} were created")
+            created += len(customers) - len(duplicates)
+            errors.extend({"line": lines[position], "error": "username or email already exists"}
+                          for position in duplicates)
+
+        errors.sort(key=lambda error: error["line"])
+        return jsonify({"data": {"received": received, "created": created, "errors": errors}})
+
     @staticmethod
     @parse_params(
         Argument("first_name", location="json",
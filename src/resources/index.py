@@ -1,10 +1,12 @@
 """
 Define the REST verbs relative to the index route
 """
-from flasgger import swag_from
 from flask.json import jsonify
 from flask_restful import Resource
 
+from utils.cache import cache_stats
+from utils.docs import swag_from
+
 
 class IndexResource(Resource):
     """ Verbs relative to the index route """
@@ -14,3 +16,9 @@ class IndexResource(Resource):
     def get():
         """ Return a message for the customer accessing the home """
         return jsonify({"message": "Welcome to Gomerce API"})
+
+    @staticmethod
+    @swag_from("../swagger/cache_stats.yml")
+    def cache_stats():
+        """ Return the hit/miss counters of the caches of this process """
+        return jsonify({"data": cache_stats()})
@@ -9,3 +9,4 @@ AUTH_BLUEPRINT = Blueprint("auth", __name__)
 
 AUTH_BLUEPRINT.route("/login-customer", methods=['POST'])(AuthResource.login_user)
 AUTH_BLUEPRINT.route("/register-customer", methods=['POST'])(AuthResource.register_user)
+AUTH_BLUEPRINT.route("/verify-token", methods=['POST'])(AuthResource.verify_token)
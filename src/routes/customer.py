@@ -10,5 +10,13 @@ CUSTOMER_BLUEPRINT = Blueprint("customer", __name__)
 CUSTOMER_BLUEPRINT.route(
     "/customers", methods=['GET'])(CustomerResource.get_all)
 CUSTOMER_BLUEPRINT.route("/customers", methods=['POST'])(CustomerResource.post)
+CUSTOMER_BLUEPRINT.route("/customers/changes", methods=['GET'])(CustomerResource.changes)
+CUSTOMER_BLUEPRINT.route("/customers/search", methods=['GET'])(CustomerResource.search)
+CUSTOMER_BLUEPRINT.route("/customers/batch", methods=['POST'])(CustomerResource.batch)
+CUSTOMER_BLUEPRINT.route("/customers/import",
+                         methods=['POST'])(CustomerResource.import_customers)
+CUSTOMER_BLUEPRINT.route("/customers/export", methods=['GET'])(CustomerResource.export)
 CUSTOMER_BLUEPRINT.route("/customers/<int:customer_id>",
                          methods=['GET'])(CustomerResource.get_one)
+CUSTOMER_BLUEPRINT.route("/customers/<int:customer_id>",
+                         methods=['PATCH'])(CustomerResource.patch)
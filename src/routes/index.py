@@ -6,3 +6,4 @@ from resources import IndexResource
 
 INDEX_BLUEPRINT = Blueprint("/", __name__)
 INDEX_BLUEPRINT.route("", methods=['GET'])(IndexResource.get)
+INDEX_BLUEPRINT.route("/cache-stats", methods=['GET'])(IndexResource.cache_stats)
@@ -1,39 +1,41 @@
-from flasgger import Swagger
+import os
+
 from flask import Flask, jsonify
 from flask.blueprints import Blueprint
-from flask_migrate import Migrate
 
 import config
 import routes
-from models import db
+from models import db, unit_of_work
+from utils import compression, docs
+from utils.json_provider import FastJSONProvider
 
-# config your API specs
-# you can define multiple specs in the case your api has multiple versions
-# ommit configs to get the default (all views exposed in /spec url)
-# rule_filter is a callable that receives "Rule" object and
-#   returns a boolean to filter in only desired views
 server = Flask(__name__)
-
-server.config["SWAGGER"] = {
-    "swagger_version": "2.0",
-    "title": "Gomerce API",
-    'uiversion': 3,
-    "static_url_path": "/apidocs",
-    'openapi': '3.0.1'
-}
-Swagger(server)
+server.json = FastJSONProvider(server)
+docs.init_app(server)
 
 server.debug = config.DEBUG
 server.config["SQLALCHEMY_DATABASE_URI"] = config.DB_URI
 server.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = config.SQLALCHEMY_TRACK_MODIFICATIONS  # noqa
 db.init_app(server)
 db.app = server
-migrate = Migrate(server, db)
+# the migrations are only run through the flask command
+if os.getenv("FLASK_RUN_FROM_CLI") == "true":
+    from flask_migrate import Migrate
+
+    migrate = Migrate(server, db)
+# compression is registered first so it runs last, on the final response
+compression.init_app(server)
+unit_of_work.init_app(server)
 
 for blueprint in vars(routes).values():
     if isinstance(blueprint, Blueprint):
         server.register_blueprint(blueprint, url_prefix=config.APPLICATION_ROOT)
 
+if config.PRECOMPILE_TEMPLATES:
+    from utils.notification_sender import precompile_templates
+
+    precompile_templates()
+
 """ Error handling """
 
 
@@ -51,11 +53,17 @@ def unprocessable(error):
 @server.errorhandler(400)
 def bad_request(error):
     print(error)
-    return jsonify({
+    body = {
         "success": False,
         "error": 400,
         "message": error.description
-    }), 400
+    }
+    # the parameters parsing lists the message of each invalid parameter
+    errors = (getattr(error, "data", None) or {}).get("message")
+    if isinstance(errors, dict):
+        body["message"] = next(iter(errors.values()), error.description)
+        body["errors"] = errors
+    return jsonify(body), 400
 
 
 # error handler for 401
@@ -88,6 +96,16 @@ def not_found(error):
     }), 404
 
 
+# error handler for 412
+@server.errorhandler(412)
+def precondition_failed(error):
+    return jsonify({
+        "success": False,
+        "error": 412,
+        "message": error.description
+    }), 412
+
+
 # error handler for 500
 @server.errorhandler(500)
 def internal_server_error(error):
@@ -99,5 +117,15 @@ def internal_server_error(error):
     }), 500
 
 
+# error handler for 503
+@server.errorhandler(503)
+def service_unavailable(error):
+    return jsonify({
+        "success": False,
+        "error": 503,
+        "message": error.description
+    }), 503, {"Retry-After": "1"}
+
+
 if __name__ == "__main__":
     server.run(host=config.HOST, port=config.PORT)
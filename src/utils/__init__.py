@@ -1,5 +1,20 @@
+import importlib
+
 from .parse_params import parse_params
 from .errors import errors
-from .utilities import generate_token
-from .mail_service import mailjet
-from .notification_sender import Notification
+
+# imported on first use, processes that never send mail do not pay for them
+_LAZY = {
+    "generate_token": ".utilities",
+    "mailjet": ".mail_service",
+    "Notification": ".notification_sender",
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
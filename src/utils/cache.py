@@ -0,0 +1,160 @@
+""" Read-through caches, an in-process LRU in front of an optional shared backend """
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+
+class LRUCache:
+    """ In-process LRU cache, entries expire `ttl` seconds after they are set """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """ Shared backend on redis, for the caches of several processes or hosts
+        Values are stored as JSON, what is read back from redis is never unpickled
+        `redis` is only needed when CACHE_SHARED_URL is set """
+
+    def __init__(self, url, ttl):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        value = self.client.get(key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value):
+        self.client.set(key, json.dumps(value), ex=self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        pass
+
+
+class Cache:
+    """ A named cache, values are looked up in the process first then in the shared backend
+        Invalidations are sent to both """
+
+    def __init__(self, name, local, shared=None):
+        self.name = name
+        self.local = local
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return f"{self.name}:{key}"
+
+    def get(self, key):
+        key = self._key(key)
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.shared_hits += 1
+                self.local.set(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        key = self._key(key)
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def delete(self, *keys):
+        keys = [self._key(key) for key in keys]
+        self.local.delete(*keys)
+        if self.shared is not None:
+            self.shared.delete(*keys)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+        self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.shared_hits) / lookups, 4) if lookups else None,
+            "size": len(self.local),
+            "maxsize": self.local.maxsize,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name):
+    """ Return the cache called `name`, created on first use from the configuration """
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                shared = None
+                if config.CACHE_SHARED_URL:
+                    shared = RedisBackend(config.CACHE_SHARED_URL, ttl=config.CACHE_TTL)
+                cache = Cache(name, LRUCache(config.CACHE_MAXSIZE, config.CACHE_TTL), shared)
+                _caches[name] = cache
+    return cache
+
+
+def cache_stats():
+    """ The hit/miss counters of every cache """
+    return {name: cache.stats() for name, cache in _caches.items()}
@@ -0,0 +1,74 @@
+""" Compression of the responses, gzip or brotli as negotiated with Accept-Encoding """
+import gzip
+import zlib
+
+from flask import request
+
+import config
+from utils.cache import LRUCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# responses of these blueprints do not change between deploys, they are compressed once
+CACHED_BLUEPRINTS = {"flasgger"}
+# the compressed bodies kept, by path, encoding and checksum of the body
+_compressed = LRUCache(maxsize=64, ttl=24 * 3600)
+
+
+def _compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=config.BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=config.GZIP_LEVEL, mtime=0)
+
+
+def encodings():
+    """ The encodings offered to the clients, preferred first """
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def _compressible(response):
+    return (
+        response.status_code >= 200 and response.status_code not in (204, 206, 304)
+        # streamed responses, e.g. the exports, are sent as they are produced
+        and not response.is_streamed and not response.direct_passthrough
+        and "Content-Encoding" not in response.headers
+        and response.mimetype in config.COMPRESSION_MIMETYPES
+    )
+
+
+def compress_response(response):
+    """ Compress the body of a response when the client accepts it and it is large enough """
+    if not config.COMPRESSION_ENABLED or not _compressible(response):
+        return response
+
+    # the representation depends on Accept-Encoding, even when it is not compressed
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(encodings())
+    data = response.get_data()
+    if encoding is None or len(data) < config.COMPRESSION_MIN_SIZE:
+        return response
+
+    if request.blueprint in CACHED_BLUEPRINTS:
+        key = (request.path, encoding, zlib.crc32(data))
+        compressed = _compressed.get(key)
+        if compressed is None:
+            compressed = _compress(data, encoding)
+            _compressed.set(key, compressed)
+    else:
+        compressed = _compress(data, encoding)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    # the bytes differ from the identity representation, only a weak ETag still holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    """ Compress the responses of `app` """
+    app.after_request(compress_response)
@@ -0,0 +1,71 @@
+""" Conditional requests, ETag / Last-Modified validators and 304 responses """
+import hashlib
+from datetime import timezone
+
+from flask import Response, request
+
+
+def make_etag(*parts, version=None):
+    """ A strong entity tag derived from what identifies a representation and its version
+        A numeric `version` is kept readable as a prefix, for `etag_version` """
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    if version is None:
+        return digest
+    return f"{version}-{digest[:20]}"
+
+
+def etag_version(etag):
+    """ The version of an entity tag made by `make_etag`, None if it has none """
+    version, separator, _ = etag.partition("-")
+    if not separator or not version.isdigit():
+        return None
+    return int(version)
+
+
+def if_match_version():
+    """ The version the client expects to modify, from If-Match
+        None when the header is absent or is `*` """
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    # the weak form is accepted too, compression weakens the ETags we send
+    for etag in request.if_match.as_set(include_weak=True):
+        version = etag_version(etag)
+        if version is not None:
+            return version
+    return -1
+
+
+def _http_time(value):
+    """ HTTP dates have no sub-second part and are in UTC, our datetimes are naive UTC """
+    if value is None:
+        return None
+    return value.replace(microsecond=0, tzinfo=value.tzinfo or timezone.utc)
+
+
+def is_conditional():
+    """ Whether the request carries validators of a copy the client holds """
+    return bool(request.if_none_match) or request.if_modified_since is not None
+
+
+def not_modified(etag, last_modified=None):
+    """ Whether the copy of the client is still current, If-None-Match has precedence """
+    if request.if_none_match:
+        # GET uses the weak comparison, compressed responses carry a weak ETag
+        return request.if_none_match.contains_weak(etag)
+    last_modified = _http_time(last_modified)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def set_validators(response, etag, last_modified=None):
+    """ Add the ETag and Last-Modified headers to a response """
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _http_time(last_modified)
+    return response
+
+
+def not_modified_response(etag, last_modified=None):
+    """ An empty 304 response carrying the validators """
+    return set_validators(Response(status=304), etag, last_modified)
@@ -0,0 +1,70 @@
+""" The API documentation, flasgger is only imported when SWAGGER_ENABLED is set """
+import hashlib
+import os
+import threading
+
+import config
+from utils.conditional import not_modified, not_modified_response, set_validators
+
+
+def swag_from(specs):
+    """ Record the spec file of a view, as flasgger's swag_from does, without importing flasgger
+        The path is relative to the module of the view, flasgger reads it when enabled """
+
+    def decorator(function):
+        function.root_path = os.path.dirname(os.path.abspath(function.__globals__["__file__"]))
+        function.swag_path = os.path.join(function.root_path, specs)
+        function.swag_type = specs.rsplit(".", 1)[-1]
+        return function
+
+    return decorator
+
+
+def _cached_spec_view(app, swagger, endpoint):
+    """ Serve the spec of `endpoint` built once, on the first request, with an ETag """
+    lock = threading.Lock()
+    cached = {}
+
+    def view():
+        if not cached:
+            with lock:
+                if not cached:
+                    body = app.json.dumps(swagger.get_apispecs(endpoint))
+                    cached["etag"] = hashlib.sha1(body.encode("utf-8")).hexdigest()
+                    cached["body"] = body
+
+        if not_modified(cached["etag"]):
+            return not_modified_response(cached["etag"])
+        response = app.response_class(cached["body"], mimetype="application/json")
+        return set_validators(response, cached["etag"])
+
+    return view
+
+
+def init_app(app):
+    """ Serve the docs UI and the specs of `app` when SWAGGER_ENABLED is set """
+    if not config.SWAGGER_ENABLED:
+        return None
+
+    from flasgger import Swagger
+
+    # config your API specs
+    # you can define multiple specs in the case your api has multiple versions
+    # ommit configs to get the default (all views exposed in /spec url)
+    # rule_filter is a callable that receives "Rule" object and
+    #   returns a boolean to filter in only desired views
+    app.config["SWAGGER"] = {
+        "swagger_version": "2.0",
+        "title": "Gomerce API",
+        'uiversion': 3,
+        "static_url_path": "/apidocs",
+        'openapi': '3.0.1'
+    }
+    swagger = Swagger(app)
+    app.extensions["flasgger"] = swagger
+
+    # the spec only changes with the code, it is not rebuilt on every request
+    for spec in swagger.config["specs"]:
+        endpoint = spec["endpoint"]
+        app.view_functions[f"flasgger.{endpoint}"] = _cached_spec_view(app, swagger, endpoint)
+    return swagger
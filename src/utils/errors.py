@@ -39,6 +39,24 @@ class ResourceNotCreated(Exception):
         self.message = message
 
 
+class InvalidParameter(Exception):
+    def __init__(self, message) -> None:
+        self.code = 400
+        self.message = message
+
+
+class PreconditionFailed(Exception):
+    def __init__(self, message) -> None:
+        self.code = 412
+        self.message = message
+
+
+class ServiceUnavailable(Exception):
+    def __init__(self, message) -> None:
+        self.code = 503
+        self.message = message
+
+
 class NotificationFailed(Exception):
     def __init__(self, message) -> None:
         self.code = 500
@@ -0,0 +1,88 @@
+""" Encode rows as NDJSON or CSV for streaming exports, decode them for imports """
+import csv
+import io
+import json
+
+from flask import current_app
+
+# flush to the client once this many characters are buffered
+CHUNK_SIZE = 64 * 1024
+
+
+def _chunked(lines):
+    """ Group lines into chunks, the first line is sent on its own
+        so the client gets the first byte without waiting for a full chunk """
+    buffer = []
+    size = 0
+    for index, line in enumerate(lines):
+        if index == 0:
+            yield line
+            continue
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def ndjson_lines(serializer, rows):
+    """ Yield one JSON document per row """
+    def lines():
+        dumps = current_app.json.dumps
+        for row in rows:
+            yield dumps(serializer.dump_row(row)) + "\n"
+
+    return _chunked(lines())
+
+
+def csv_lines(serializer, rows):
+    """ Yield a CSV header then one line per row """
+    def lines():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(serializer.columns)
+        for row in rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(serializer.encode_row(row))
+        yield buffer.getvalue()
+
+    return _chunked(lines())
+
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", ndjson_lines),
+    "csv": ("text/csv", csv_lines),
+}
+
+
+def ndjson_records(lines):
+    """ Yield the line number and the document of each non blank line,
+        a line that is not valid JSON yields None """
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+def csv_records(lines):
+    """ Yield the line number and a dict of each line after the header """
+    lines = (line.decode("utf-8") if isinstance(line, bytes) else line for line in lines)
+    reader = csv.DictReader(lines)
+    for record in reader:
+        yield reader.line_num, record
+
+
+IMPORT_FORMATS = {
+    "application/x-ndjson": ndjson_records,
+    "text/csv": csv_records,
+}
@@ -1,14 +1,55 @@
 """ Mailjet Email service"""
 
+import json
 import os
-from mailjet_rest import Client
+import threading
+from urllib.parse import urljoin
 
-from config import EMAIL_API_SECRET, EMAIL_API_KEY
+import requests
+from requests.adapters import HTTPAdapter
 
+import config
+
+# one keep-alive session per process, so sends reuse the TCP+TLS connections
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def _create_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.EMAIL_HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.auth = (config.EMAIL_API_KEY, config.EMAIL_API_SECRET)
+    session.headers.update({"Content-Type": "application/json"})
+    return session
+
+
+def get_session():
+    """ Return the session of this process, created on first use """
+    global _session, _session_pid
+
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                _session = _create_session()
+                _session_pid = os.getpid()
+    return _session
 
-def mailjet(data):
-    mailjet_client = Client(auth=(EMAIL_API_KEY, EMAIL_API_KEY), version='v3.1')
 
+def _forget_session():
+    """ The connections inherited through fork belong to the parent, never reuse them """
+    global _session, _session_pid, _session_lock
+    _session = None
+    _session_pid = None
+    _session_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_session)
+
+
+def mailjet(data):
     """ Dummy data for format
     data = {
         'Messages': [
@@ -30,7 +71,6 @@ def mailjet(data):
         ]
     }
     """
-
-    return mailjet_client.send.create(data=data)
-    # print(result.status_code)
-    # print(result.json())
+    url = urljoin(config.EMAIL_API_URL, "v3.1/send")
+    timeout = (config.EMAIL_HTTP_CONNECT_TIMEOUT, config.EMAIL_HTTP_READ_TIMEOUT)
+    return get_session().post(url, data=json.dumps(data), timeout=timeout)
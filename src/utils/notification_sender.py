@@ -1,10 +1,41 @@
 """ Email or/and SMS notification sender"""
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+import os
 
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+import config
 from config import EMAIL_SENDER_NAME, EMAIL_SENDER_EMAIL
-from utils.mail_service import mailjet
 from utils.errors import NotificationFailed
 
+TEMPLATES_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "templates")
+
+# a single environment per process keeps the compiled templates in memory
+_environment = None
+
+
+def get_template_environment():
+    """ Return the shared template environment, created on first use """
+    global _environment
+
+    if _environment is None:
+        _environment = Environment(
+            loader=FileSystemLoader(TEMPLATES_FOLDER),
+            autoescape=select_autoescape(['html', 'xml']),
+            # compiled templates survive restarts, the cold start skips the parsing
+            bytecode_cache=FileSystemBytecodeCache(config.TEMPLATE_BYTECODE_CACHE_DIR),
+            # only look for changes of the template files while developing
+            auto_reload=config.DEBUG,
+        )
+    return _environment
+
+
+def precompile_templates():
+    """ Compile every template ahead of the first email """
+    environment = get_template_environment()
+    for name in environment.list_templates():
+        environment.get_template(name)
+
 
 class Notification:
     """ Defines notification methods """
@@ -16,10 +47,7 @@ class Notification:
         self.env = None
 
         if self.email:
-            self.env = Environment(
-                loader=FileSystemLoader('templates'),
-                autoescape=select_autoescape(['html', 'xml'])
-            )
+            self.env = get_template_environment()
 
     def create_email_template(self, file_name, **kwargs):
         """ creates an email template using a html file """
@@ -28,35 +56,90 @@ class Notification:
         return html
 
     @staticmethod
-    def send_email(to, subject, message, sender=None):
-        """ Sends email to the 'to' variable"""
+    def _build_message(to, subject, message, sender=None, custom_id=None):
+        """ Build the mailjet data of a single message """
         if sender is None:
             sender = {
                 'name': EMAIL_SENDER_NAME,
                 'email': EMAIL_SENDER_EMAIL,
             }
-        # build the mailjet data
         data = {
-            'Messages': [
+            "From": {
+                "Email": sender['email'],
+                "Name": sender['name']
+            },
+            "To": [
                 {
-                    "From": {
-                        "Email": sender['email'],
-                        "Name": sender['name']
-                    },
-                    "To": [
-                        {
-                            "Email": to['email'],
-                            "Name": to['name']
-                        }
-                    ],
-                    "Subject": subject,
-                    "HTMLPart": message
+                    "Email": to['email'],
+                    "Name": to['name']
                 }
-            ]
+            ],
+            "Subject": subject,
+            "HTMLPart": message
         }
+        if custom_id is not None:
+            data["CustomID"] = custom_id
+        return data
+
+    @classmethod
+    def send_email(cls, to, subject, message, sender=None):
+        """ Sends email to the 'to' variable"""
+        # build the mailjet data
+        data = {
+            'Messages': [cls._build_message(to, subject, message, sender)]
+        }
+
+        # requests is only imported by the processes sending emails
+        from utils.mail_service import mailjet
 
         result = mailjet(data)
         if result.status_code != 200:
             raise NotificationFailed("Email notification not sent!")
 
         return result
+
+    @classmethod
+    def send_batch(cls, emails):
+        """ Sends many emails with one call per MAILJET_BATCH_SIZE emails
+            `emails` are dicts of the `send_email` arguments
+            Return the error of each email, in order, None for the emails sent """
+        errors = []
+        for start in range(0, len(emails), config.MAILJET_BATCH_SIZE):
+            chunk = emails[start:start + config.MAILJET_BATCH_SIZE]
+            errors.extend(cls._send_chunk(chunk))
+        return errors
+
+    @classmethod
+    def _send_chunk(cls, emails):
+        """ Send emails in a single call and map the result of each message back """
+        custom_ids = [str(index) for index in range(len(emails))]
+        data = {
+            'Messages': [
+                cls._build_message(custom_id=custom_id, **email)
+                for custom_id, email in zip(custom_ids, emails)
+            ]
+        }
+        from utils.mail_service import mailjet
+
+        try:
+            result = mailjet(data)
+            results = result.json().get("Messages") or []
+        except Exception as e:
+            return [f"Email notification not sent! {e!r}"] * len(emails)
+
+        # mailjet answers 400 when some messages fail, with a status for each of them
+        statuses = {}
+        for position, message in enumerate(results[:len(custom_ids)]):
+            statuses[message.get("CustomID") or custom_ids[position]] = message
+
+        errors = []
+        for custom_id in custom_ids:
+            message = statuses.get(custom_id)
+            if message is None:
+                errors.append(f"Email notification not sent! status {result.status_code}")
+            elif message.get("Status") != "success":
+                details = "; ".join(error.get("ErrorMessage", "") for error in message.get("Errors", []))
+                errors.append(f"Email notification not sent! {details}".strip())
+            else:
+                errors.append(None)
+        return errors
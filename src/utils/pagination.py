@@ -0,0 +1,25 @@
+""" Opaque cursors for keyset pagination """
+import base64
+import binascii
+import json
+
+from utils.errors import InvalidParameter
+
+
+def encode_cursor(position):
+    """ Encodes the position of the last row of a page into an opaque token """
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """ Decodes a token created by `encode_cursor` back into the position """
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidParameter("The cursor provided is not valid")
+
+    if not isinstance(position, dict):
+        raise InvalidParameter("The cursor provided is not valid")
+    return position
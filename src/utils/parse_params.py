@@ -3,14 +3,136 @@ Wrap parameters parsing
 As it's quite ugly and messy
 """
 from functools import wraps
+
+from flask import request
 from flask_restful import reqparse
+from werkzeug.exceptions import BadRequest
+
+# where the fast path reads the arguments, the others go through reqparse
+FAST_LOCATIONS = {
+    "json": "the JSON body",
+    "args": "the query string",
+}
+
+
+class CompiledArgument:
+    """ What parsing an `Argument` needs, resolved once when the resource is decorated """
+
+    __slots__ = ("name", "dest", "location", "required", "default", "convert", "choices",
+                 "append", "store_missing", "help")
+
+    def __init__(self, argument):
+        self.name = argument.name
+        self.dest = argument.dest or argument.name
+        self.location = argument.location
+        self.required = argument.required
+        self.default = argument.default
+        self.convert = _converter(argument.type)
+        self.choices = argument.choices
+        self.append = argument.action == "append"
+        self.store_missing = argument.store_missing
+        self.help = argument.help
+
+    @staticmethod
+    def supports(argument):
+        """ Whether the fast path parses `argument` exactly as reqparse would """
+        return (
+            isinstance(argument.location, str) and argument.location in FAST_LOCATIONS
+            and argument.action in ("store", "append") and tuple(argument.operators) == ("=",)
+            and argument.case_sensitive and not argument.trim and not argument.ignore
+            and argument.nullable
+        )
+
+    def error(self, error):
+        """ The message of `error`, in the help of the argument as reqparse formats it """
+        return self.help.format(error_msg=str(error)) if self.help else str(error)
+
+    def parse(self, source):
+        """ Return the value of the argument in `source`, found or not, or raise a ValueError """
+        if self.name in source:
+            if self.location == "args":
+                values = source.getlist(self.name)
+            else:
+                values = source[self.name]
+                if not (self.append and isinstance(values, list)):
+                    values = [values]
+
+            results = []
+            for value in values:
+                try:
+                    value = self.convert(value)
+                except Exception as e:
+                    raise ValueError(self.error(e))
+                if self.choices and value not in self.choices:
+                    raise ValueError(self.error(f"{value} is not a valid choice"))
+                results.append(value)
+
+            if results:
+                return (results if self.append else results[0]), True
+
+        if self.required:
+            raise ValueError(self.error(
+                f"Missing required parameter in {FAST_LOCATIONS[self.location]}"))
+        return (self.default() if callable(self.default) else self.default), False
+
+
+def _converter(type_):
+    """ Call `type_` like reqparse does, with the name and the operator when it accepts them
+        The builtin types only accept the value, they are called directly """
+    if type_ is reqparse.text_type:
+        type_ = str
+    if type_ in (str, int, float):
+        return lambda value: None if value is None else type_(value)
+
+    def convert(value):
+        if value is None:
+            return None
+        try:
+            return type_(value, None, "=")
+        except TypeError:
+            try:
+                return type_(value, None)
+            except TypeError:
+                return type_(value)
+
+    return convert
+
+
+def _sources(arguments):
+    """ The json and args of the request, read only when an argument is located there """
+    sources = {}
+    for location in {argument.location for argument in arguments}:
+        if location == "json":
+            data = request.json
+            sources[location] = data if isinstance(data, dict) else {}
+        else:
+            sources[location] = request.args
+    return sources
+
+
+def _invalid_parameters(errors):
+    """ A 400 error listing the message of every invalid parameter by name,
+        like the errors of reqparse """
+    error = BadRequest(next(iter(errors.values())))
+    error.data = {"message": errors}
+    return error
 
 
 def parse_params(*arguments):
     """
     Parse the parameters
     Forward them to the wrapped function as named parameters
+    The arguments are compiled once, arguments the fast path does not support
+    are parsed by a single RequestParser, both report every invalid argument
     """
+    if all(CompiledArgument.supports(argument) for argument in arguments):
+        compiled = [CompiledArgument(argument) for argument in arguments]
+        parser = None
+    else:
+        compiled = None
+        parser = reqparse.RequestParser(bundle_errors=True)
+        for argument in arguments:
+            parser.add_argument(argument)
 
     def parse(func):
         """ Wrapper """
@@ -18,10 +140,22 @@ def parse_params(*arguments):
         @wraps(func)
         def resource_verb(*args, **kwargs):
             """ Decorated function """
-            parser = reqparse.RequestParser()
-            for argument in arguments:
-                parser.add_argument(argument)
-            kwargs.update(parser.parse_args())
+            if parser is not None:
+                kwargs.update(parser.parse_args())
+                return func(*args, **kwargs)
+
+            sources = _sources(compiled)
+            errors = {}
+            for argument in compiled:
+                try:
+                    value, found = argument.parse(sources[argument.location])
+                except ValueError as e:
+                    errors[argument.name] = str(e)
+                    continue
+                if found or argument.store_missing:
+                    kwargs[argument.dest] = value
+            if errors:
+                raise _invalid_parameters(errors)
             return func(*args, **kwargs)
 
         return resource_verb
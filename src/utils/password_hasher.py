@@ -0,0 +1,145 @@
+""" Password hashing and verification off the request threads """
+import hashlib
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from werkzeug.security import (DEFAULT_PBKDF2_ITERATIONS, check_password_hash,
+                               generate_password_hash)
+
+import config
+from utils.errors import ServiceUnavailable
+
+# method$salt$hash, the format of werkzeug, e.g. pbkdf2:sha256:260000$<salt>$<hex digest>
+HASH_FORMAT = re.compile(r"^pbkdf2:(?P<name>[\w-]+)(?::\d+)?\$[^$]+\$[0-9a-f]+$")
+
+
+def _normalize_method(method):
+    """ Werkzeug stores pbkdf2 hashes with their iterations, e.g. pbkdf2:sha256:260000 """
+    if method.startswith("pbkdf2:") and method.count(":") == 1:
+        return f"{method}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+def _hash_chunk(passwords, method, salt_length):
+    """ Hash a few passwords in a single job of the pool """
+    return [generate_password_hash(password, method, salt_length) for password in passwords]
+
+
+class PasswordHasher:
+    """ Hash and verify passwords in a process pool
+        At most `workers + queue_size` operations are accepted at a time,
+        past that callers get a ServiceUnavailable instead of piling up """
+
+    def __init__(self, method, salt_length, workers, queue_size, timeout):
+        self.method = _normalize_method(method)
+        self.salt_length = salt_length
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._reset()
+
+    def _reset(self):
+        """ Drop the pool and the slots, the pool is created again on first use """
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _submit(self, func, *args, wait=None):
+        """ Submit a job holding one of the slots until it is done
+            Without a free slot after `wait` seconds, raise a ServiceUnavailable """
+        if not self._slots.acquire(blocking=wait is not None, timeout=wait):
+            raise ServiceUnavailable("Too many authentication requests, try again shortly")
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, func, *args):
+        # without workers, hash inline (tests, CLI and migration runs)
+        if not self.workers:
+            return func(*args)
+
+        future = self._submit(func, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise ServiceUnavailable("Too many authentication requests, try again shortly")
+
+    def hash(self, password):
+        """ Hash a password with the configured parameters """
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def hash_many(self, passwords, chunksize=4):
+        """ Hash many passwords at once, spread over every worker of the pool
+            The passwords are sent in chunks of `chunksize`, each holding a slot like a hash,
+            and at most `workers` chunks are queued at a time, so logins and registrations
+            only ever wait behind a few chunks of a large batch """
+        if not self.workers or len(passwords) < 2:
+            return [self.hash(password) for password in passwords]
+
+        chunks = [passwords[start:start + chunksize]
+                  for start in range(0, len(passwords), chunksize)]
+        pending, hashes = deque(), []
+        try:
+            for chunk in chunks:
+                if len(pending) == self.workers:
+                    hashes.extend(pending.popleft().result(timeout=self.timeout * chunksize))
+                # a batch waits for a slot rather than being turned away at once
+                pending.append(self._submit(_hash_chunk, chunk, self.method, self.salt_length,
+                                            wait=self.timeout))
+            while pending:
+                hashes.extend(pending.popleft().result(timeout=self.timeout * chunksize))
+        except TimeoutError:
+            raise ServiceUnavailable("Hashing the passwords took too long, try again shortly")
+        finally:
+            # the chunks not started yet are not left for the pool to grind through
+            for future in pending:
+                future.cancel()
+        return hashes
+
+    def verify(self, pwhash, password):
+        """ Check a password against a hash """
+        return self._run(check_password_hash, pwhash, password)
+
+    @staticmethod
+    def is_hash(pwhash):
+        """ Whether `pwhash` is a hash in the method$salt$hash format `verify` checks """
+        match = HASH_FORMAT.match(pwhash)
+        return match is not None and match.group("name") in hashlib.algorithms_available
+
+    def needs_rehash(self, pwhash):
+        """ Whether a hash was made with other parameters than the configured ones """
+        method, _, rest = pwhash.partition("$")
+        salt = rest.partition("$")[0]
+        return method != self.method or len(salt) != self.salt_length
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._reset()
+
+
+password_hasher = PasswordHasher(
+    method=config.PASSWORD_HASH_METHOD,
+    salt_length=config.PASSWORD_SALT_LENGTH,
+    workers=config.PASSWORD_HASH_WORKERS,
+    queue_size=config.PASSWORD_HASH_QUEUE_SIZE,
+    timeout=config.PASSWORD_HASH_TIMEOUT,
+)
+
+# a pool inherited through fork belongs to the parent, start a new one in the child
+os.register_at_fork(after_in_child=password_hasher._reset)
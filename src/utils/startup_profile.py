@@ -0,0 +1,60 @@
+"""
+Startup profile, the import time of a module broken down by module and by package
+
+Imports the module in a fresh interpreter with `python -X importtime`,
+so what was imported before is not hidden.
+
+    cd src && python -m utils.startup_profile [module] [top]
+"""
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# import time:       self [us] |  cumulative | imported package
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def profile(module="server", env=None):
+    """ Import `module` in a fresh interpreter
+        Return the modules imported, in order, as (name, self us, cumulative us, depth) """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=SRC, env=dict(os.environ, **(env or {})),
+                            capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append((name, int(own), int(cumulative), len(indent) // 2))
+    return modules
+
+
+def total_time(modules, module="server"):
+    """ The cumulative import time of `module`, in seconds """
+    return next(cumulative for name, _, cumulative, _ in reversed(modules) if name == module) / 1e6
+
+
+def report(module="server", top=20, env=None):
+    """ The import time of `module`, its slowest imports and the time of each package """
+    modules = profile(module, env)
+    packages = defaultdict(int)
+    for name, own, _, _ in modules:
+        packages[name.split(".")[0]] += own
+
+    lines = [f"import {module}: {total_time(modules, module) * 1000:.0f} ms, "
+             f"{len(modules)} modules", "", f"{'cumulative':>12} {'self':>8}  module"]
+    slowest = sorted(modules, key=lambda entry: entry[2], reverse=True)[:top]
+    lines += [f"{cumulative / 1000:>10.1f}ms {own / 1000:>6.1f}ms  {name}"
+              for name, own, cumulative, _ in slowest]
+    lines += ["", f"{'self':>12}  package"]
+    lines += [f"{own / 1000:>10.1f}ms  {package}"
+              for package, own in sorted(packages.items(), key=lambda item: -item[1])[:top]]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(report(sys.argv[1] if len(sys.argv) > 1 else "server",
+                 int(sys.argv[2]) if len(sys.argv) > 2 else 20))
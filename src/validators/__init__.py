@@ -0,0 +1 @@
+from .customer import validate_customer
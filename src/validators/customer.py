@@ -0,0 +1,56 @@
+""" Validation of the customers data """
+import re
+
+from models import Customer
+from utils.password_hasher import PasswordHasher
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+REQUIRED_FIELDS = ("username", "email", "first_name", "last_name")
+OPTIONAL_FIELDS = ("phone", "country", "state", "city", "street_name", "zipcode")
+
+# the maximum length of the fields, from the columns
+MAX_LENGTHS = {
+    column.key: column.type.length
+    for column in Customer.__table__.columns
+    if getattr(column.type, "length", None)
+}
+
+
+def validate_customer(data):
+    """ Validate and clean the data of a new customer
+        Either `password`, hashed on creation, or an already hashed `password_hash` is required
+        Return the cleaned data and None, or None and the error message """
+    if not isinstance(data, dict):
+        return None, "A customer must be an object"
+
+    customer = {}
+    for field in REQUIRED_FIELDS + OPTIONAL_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str):
+            value = value.strip() or None
+        if value is None:
+            if field in REQUIRED_FIELDS:
+                return None, f"{field} is required"
+            continue
+        if not isinstance(value, str):
+            value = str(value)
+        if field in MAX_LENGTHS and len(value) > MAX_LENGTHS[field]:
+            return None, f"{field} is longer than {MAX_LENGTHS[field]} characters"
+        customer[field] = value
+
+    if not EMAIL_PATTERN.match(customer["email"]):
+        return None, "email is not valid"
+    if "@" in customer["username"]:
+        return None, "username cannot contain @"
+
+    if data.get("password"):
+        customer["password"] = str(data["password"])
+    elif data.get("password_hash"):
+        if not PasswordHasher.is_hash(str(data["password_hash"])):
+            return None, "password_hash is not a method$salt$hash password hash"
+        customer["password_hash"] = str(data["password_hash"])
+    else:
+        return None, "password is required"
+
+    return customer, None
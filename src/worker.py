@@ -0,0 +1,14 @@
+""" Run the background workers, separately from the API server """
+import config
+from server import server
+from workers import EmailOutboxWorker, MaintenanceScheduler
+
+if __name__ == "__main__":
+    scheduler = None
+    if config.MAINTENANCE_ENABLED:
+        scheduler = MaintenanceScheduler(server).add_default_jobs().start()
+
+    EmailOutboxWorker(server).run()
+
+    if scheduler is not None:
+        scheduler.stop()
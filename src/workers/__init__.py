@@ -0,0 +1,2 @@
+from .email_outbox import EmailOutboxWorker
+from .maintenance import MaintenanceScheduler
@@ -0,0 +1,81 @@
+""" Background delivery of the email outbox """
+import logging
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from models import db
+from repositories import EmailOutboxRepository
+from utils import Notification
+
+
+class EmailOutboxWorker:
+    """ Drains the email outbox, sending the claimed emails in concurrent batches """
+
+    def __init__(self, app, batch_size=None, concurrency=None):
+        self.app = app
+        self.batch_size = batch_size or config.OUTBOX_BATCH_SIZE
+        self.concurrency = concurrency or config.OUTBOX_CONCURRENCY
+        self.running = False
+
+    @staticmethod
+    def _send(emails):
+        """ Send emails in one provider call, return the error of each of them """
+        return Notification.send_batch([
+            {
+                'to': {'name': email.recipient_name, 'email': email.recipient_email},
+                'sender': {'name': email.sender_name, 'email': email.sender_email},
+                'subject': email.subject,
+                'message': email.html,
+            }
+            for email in emails
+        ])
+
+    def run_once(self):
+        """ Claim a batch of due emails, send them and record the outcome
+            Return the number of emails processed """
+        with self.app.app_context():
+            # the claimed emails are read by the sending threads after the claim is
+            # committed, keep them loaded instead of refreshing them one by one
+            db.session().expire_on_commit = False
+            emails = EmailOutboxRepository.claim(self.batch_size, lease=config.OUTBOX_LEASE)
+            if not emails:
+                return 0
+
+            # one provider call per chunk, only the HTTP calls run in the threads
+            size = config.MAILJET_BATCH_SIZE
+            chunks = [emails[start:start + size] for start in range(0, len(emails), size)]
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                errors = [error for chunk in executor.map(self._send, chunks) for error in chunk]
+
+            # only the emails that failed are queued again
+            for email, error in zip(emails, errors):
+                if error is None:
+                    EmailOutboxRepository.mark_sent(email)
+                else:
+                    logging.warning("email %s to %s failed: %s", email.id, email.recipient_email, error)
+                    EmailOutboxRepository.mark_failed(email, error,
+                                                      max_attempts=config.OUTBOX_MAX_ATTEMPTS,
+                                                      backoff=config.OUTBOX_BACKOFF,
+                                                      max_backoff=config.OUTBOX_MAX_BACKOFF)
+            db.session.commit()
+            db.session.remove()
+            return len(emails)
+
+    def stop(self, *args):
+        self.running = False
+
+    def run(self):
+        """ Drain the outbox until stopped, sleeping while it is empty """
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while self.running:
+            try:
+                processed = self.run_once()
+            except Exception:
+                logging.exception("email outbox worker iteration failed")
+                processed = 0
+            if not processed:
+                time.sleep(config.OUTBOX_POLL_INTERVAL)
@@ -0,0 +1,66 @@
+""" Periodic maintenance of the database """
+import logging
+import threading
+import time
+
+import config
+from repositories import (CustomerRepository, SignedVerificationTokenRepository,
+                          VerificationTokenRepository)
+
+
+class MaintenanceScheduler:
+    """ Runs the maintenance jobs at their interval, in a background thread """
+
+    def __init__(self, app):
+        self.app = app
+        self.jobs = []
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def add_job(self, name, interval, func, *args):
+        """ Run `func(*args)` every `interval` seconds, the first run is right away """
+        self.jobs.append({"name": name, "interval": interval, "func": func, "args": args,
+                          "next_run": 0})
+
+    def add_default_jobs(self):
+        """ Register the built-in jobs """
+        batch_size = config.PURGE_BATCH_SIZE
+        self.add_job("purge expired verification tokens", config.PURGE_INTERVAL,
+                     VerificationTokenRepository.purge_expired, batch_size)
+        self.add_job("purge expired used verification tokens", config.PURGE_INTERVAL,
+                     SignedVerificationTokenRepository.purge_expired, batch_size)
+        self.add_job("purge old customer tombstones", config.PURGE_INTERVAL,
+                     CustomerRepository.purge_tombstones, batch_size)
+        return self
+
+    def run_pending(self):
+        """ Run the jobs that are due, return the delay until the next one """
+        now = time.monotonic()
+        for job in self.jobs:
+            if job["next_run"] > now:
+                continue
+            job["next_run"] = now + job["interval"]
+            with self.app.app_context():
+                try:
+                    result = job["func"](*job["args"])
+                    logging.info("maintenance: %s -> %s", job["name"], result)
+                except Exception:
+                    logging.exception("maintenance: %s failed", job["name"])
+        if not self.jobs:
+            return None
+        return max(0, min(job["next_run"] for job in self.jobs) - time.monotonic())
+
+    def _run(self):
+        while not self._stopped.is_set():
+            delay = self.run_pending()
+            self._stopped.wait(delay if delay is not None else 60)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="maintenance", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
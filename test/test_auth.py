@@ -0,0 +1,122 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import config
+from models import Customer
+from models.abc import db
+from repositories import VerificationTokenRepository
+from server import server
+from utils.cache import get_cache
+from utils.errors import ServiceUnavailable
+from utils.password_hasher import PasswordHasher, password_hasher
+
+
+class TestAuth(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        server.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        cls.client = server.test_client()
+
+    def setUp(self):
+        db.create_all()
+        get_cache(Customer.cache_name).clear()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def add_customer(self, pwhash):
+        customer = Customer(username="jdoe", email="jdoe@mail.com", first_name="John",
+                            last_name="Doe", password=pwhash)
+        return customer.save()
+
+    def login(self, username, password):
+        return self.client.post("/api/login-customer", content_type="application/json",
+                                data=json.dumps({"username": username, "password": password}))
+
+    def test_login(self):
+        """ The POST on `/login-customer` should only accept the right password """
+        self.add_customer(password_hasher.hash("secret"))
+
+        response = self.login("jdoe", "secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)["data"]["username"], "jdoe")
+
+        self.assertEqual(self.login("jdoe", "wrong").status_code, 401)
+        self.assertEqual(self.login("nobody", "secret").status_code, 401)
+
+    def test_login_ignores_case(self):
+        """ The POST on `/login-customer` should match the username or the email in any case """
+        self.add_customer(password_hasher.hash("secret"))
+
+        self.assertEqual(self.login("JDoe", "secret").status_code, 200)
+        self.assertEqual(self.login("JDOE@Mail.com", "secret").status_code, 200)
+        # an identifier with an @ is only matched against the emails
+        self.assertEqual(self.login("jdoe@", "secret").status_code, 401)
+
+    def test_login_rehashes_outdated_hash(self):
+        """ A login should upgrade a hash made with outdated parameters """
+        customer = self.add_customer(generate_password_hash("secret", "pbkdf2:sha256:1000", 8))
+        self.assertTrue(customer.password_needs_rehash())
+
+        self.assertEqual(self.login("jdoe", "secret").status_code, 200)
+
+        customer = Customer.query.get(customer.id)
+        self.assertFalse(customer.password_needs_rehash())
+        self.assertTrue(customer.check_password("secret"))
+
+    def test_hasher_back_pressure(self):
+        """ The hasher should refuse work past its queue instead of waiting """
+        hasher = PasswordHasher("pbkdf2:sha256", 16, workers=1, queue_size=0, timeout=10)
+        hasher._slots.acquire()
+        try:
+            with self.assertRaises(ServiceUnavailable):
+                hasher.hash("secret")
+        finally:
+            hasher.shutdown()
+
+    def test_hasher_hash_many_takes_slots(self):
+        """ A batch of hashes should go through the slots of the hasher, a chunk at a time """
+        hasher = PasswordHasher("pbkdf2:sha256:1000", 8, workers=2, queue_size=0, timeout=1)
+        try:
+            hashes = hasher.hash_many([f"secret{index}" for index in range(9)], chunksize=2)
+            self.assertEqual(len(hashes), 9)
+            self.assertTrue(all(check_password_hash(pwhash, f"secret{index}")
+                                for index, pwhash in enumerate(hashes)))
+
+            # every slot taken, the batch waits for one then gives up
+            hasher._slots.acquire()
+            hasher._slots.acquire()
+            with self.assertRaises(ServiceUnavailable):
+                hasher.hash_many(["secret", "secret"])
+        finally:
+            hasher.shutdown()
+
+    def verify(self, token):
+        return self.client.post("/api/verify-token", content_type="application/json",
+                                data=json.dumps({"token": token}))
+
+    def test_verify_token_single_use(self):
+        """ The POST on `/verify-token` should accept a token once, in both modes """
+        for mode in ("database", "signed"):
+            with self.subTest(mode=mode), patch.object(config, "VERIFICATION_TOKEN_MODE", mode), \
+                    patch.object(config, "SECRET_KEY", "secret"):
+                token = VerificationTokenRepository.issue(user_id=7, user_type="customer",
+                                                          channel="email")
+
+                response = self.verify(token)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(json.loads(response.data)["data"],
+                                 {"user_id": 7, "user_type": "customer", "channel": "email"})
+                self.assertEqual(self.verify(token).status_code, 404)
+
+    def test_verify_signed_token_rejects_tampering(self):
+        """ A signed token should not be accepted once altered """
+        with patch.object(config, "VERIFICATION_TOKEN_MODE", "signed"), \
+                patch.object(config, "SECRET_KEY", "secret"):
+            token = VerificationTokenRepository.issue(user_id=7, user_type="customer",
+                                                      channel="email")
+            self.assertEqual(self.verify(token[:-2] + "xx").status_code, 404)
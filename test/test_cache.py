@@ -0,0 +1,144 @@
+import json
+import unittest
+
+from sqlalchemy import event, update
+from werkzeug.security import generate_password_hash
+
+from models import Customer
+from models.abc import db
+from repositories import CustomerRepository
+from server import server
+from utils.cache import LRUCache, get_cache
+
+
+class FakeSharedBackend:
+    """ A shared backend kept in memory """
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.entries[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class TestCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        server.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        cls.client = server.test_client()
+
+    def setUp(self):
+        db.create_all()
+        self.cache = get_cache(Customer.cache_name)
+        self.cache.clear()
+        self.customer_id = Customer(username="jdoe", email="jdoe@mail.com", first_name="John",
+                                    last_name="Doe", password="hash").save().id
+        db.session.remove()
+        self.queries = []
+        event.listen(db.engine, "before_cursor_execute", self.count_query)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self.count_query)
+        self.cache.shared = None
+        self.cache.clear()
+        db.session.remove()
+        db.drop_all()
+
+    def count_query(self, conn, cursor, statement, *args):
+        self.queries.append(statement)
+
+    def test_read_through(self):
+        """ A customer should be read from the database once, then from the cache """
+        CustomerRepository.get(customer_id=self.customer_id)
+        db.session.remove()
+        customer = CustomerRepository.get(username="jdoe@mail.com")
+
+        self.assertEqual(customer.first_name, "John")
+        self.assertEqual(len(self.queries), 1)
+        self.assertGreaterEqual(self.cache.stats()["hits"], 2)
+
+    def test_save_invalidates(self):
+        """ Saving a customer should drop its cached copies, old logins included """
+        customer = CustomerRepository.get(username="jdoe")
+        customer.username = "johndoe"
+        customer.save()
+        db.session.remove()
+
+        self.assertEqual(CustomerRepository.get(customer_id=self.customer_id).username, "johndoe")
+        self.assertIsNone(CustomerRepository.get(username="jdoe"))
+
+    def test_shared_backend(self):
+        """ Entries should be found in the shared backend when the process lost them """
+        self.cache.shared = FakeSharedBackend()
+        CustomerRepository.get(customer_id=self.customer_id)
+        self.cache.local.clear()
+        db.session.remove()
+
+        self.assertEqual(CustomerRepository.get(customer_id=self.customer_id).username, "jdoe")
+        self.assertEqual(len(self.queries), 1)
+        self.assertEqual(self.cache.stats()["shared_hits"], 1)
+
+    def test_password_not_cached(self):
+        """ The password hash should stay out of the cache, read from the database when needed """
+        self.cache.shared = FakeSharedBackend()
+        CustomerRepository.get(customer_id=self.customer_id)
+        db.session.remove()
+
+        data = self.cache.get(f"id:{self.customer_id}")
+        self.assertNotIn("password", data)
+        # what the shared backend stores is JSON
+        json.dumps(self.cache.shared.entries)
+
+        self.queries.clear()
+        customer = CustomerRepository.get(username="jdoe")
+        self.assertEqual(customer.created_at, Customer.query.get(self.customer_id).created_at)
+        self.assertEqual(customer.password, "hash")
+
+    def test_rehash_stale_copy(self):
+        """ A login rehashing the password of a stale cached copy should not fail """
+        db.session.execute(update(Customer).where(Customer.id == self.customer_id).values(
+            password=generate_password_hash("secret", "pbkdf2:sha256:1000", 8)))
+        db.session.commit()
+        CustomerRepository.get(customer_id=self.customer_id)
+        db.session.remove()
+        # another process changed the customer, this one still caches the previous version
+        db.session.execute(update(Customer).where(Customer.id == self.customer_id).values(
+            first_name="Jane", version=Customer.version + 1))
+        db.session.commit()
+        db.session.remove()
+
+        response = self.client.post("/api/login-customer", content_type="application/json",
+                                    data=json.dumps({"username": "jdoe", "password": "secret"}))
+
+        self.assertEqual(response.status_code, 200)
+        customer = Customer.query.get(self.customer_id)
+        self.assertEqual((customer.first_name, customer.version), ("Jane", 3))
+        self.assertFalse(customer.password_needs_rehash())
+
+    def test_cache_stats(self):
+        """ The GET on `/cache-stats` should expose the counters """
+        CustomerRepository.get(customer_id=self.customer_id)
+        response = self.client.get("/api/cache-stats")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)["data"]["customer"]["misses"], 1)
+
+    def test_lru_eviction(self):
+        """ The least recently used entry should be evicted first """
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
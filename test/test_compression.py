@@ -0,0 +1,67 @@
+import gzip
+import json
+import unittest
+from unittest.mock import patch
+
+from models import Customer
+from models.abc import db
+from server import server
+from utils import compression
+
+
+class TestCompression(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        server.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        cls.client = server.test_client()
+
+    def setUp(self):
+        db.create_all()
+        for index in range(30):
+            db.session.add(Customer(username=f"user{index}", email=f"user{index}@mail.com",
+                                    first_name="John", last_name="Doe", city="Lagos",
+                                    password="hash"))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def test_gzip(self):
+        """ Large JSON responses should be compressed for the clients accepting gzip """
+        plain = self.client.get("/api/customers")
+        response = self.client.get("/api/customers", headers={"Accept-Encoding": "gzip"})
+
+        self.assertIsNone(plain.headers.get("Content-Encoding"))
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertLess(len(response.data), len(plain.data))
+        self.assertEqual(json.loads(gzip.decompress(response.data)), json.loads(plain.data))
+
+        # the compressed bytes only carry a weak ETag, still valid for revalidation
+        etag = response.headers["ETag"]
+        self.assertTrue(etag.startswith("W/"))
+        revalidated = self.client.get("/api/customers", headers={"Accept-Encoding": "gzip",
+                                                                 "If-None-Match": etag})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_skipped(self):
+        """ Small, refused and streamed responses should be sent as they are """
+        for url, headers in (("/api/customers/1", {"Accept-Encoding": "gzip"}),
+                             ("/api/customers", {"Accept-Encoding": "gzip;q=0"}),
+                             ("/api/customers/export", {"Accept-Encoding": "gzip"})):
+            with self.subTest(url=url):
+                response = self.client.get(url, headers=headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertIsNone(response.headers.get("Content-Encoding"))
+
+    def test_spec_compressed_once(self):
+        """ The API spec should be compressed once and served from the cache after """
+        compression._compressed.clear()
+        with patch.object(compression, "_compress", wraps=compression._compress) as compress:
+            for _ in range(3):
+                response = self.client.get("/apispec_1.json", headers={"Accept-Encoding": "gzip"})
+                self.assertEqual(response.headers["Content-Encoding"], "gzip")
+                self.assertIn("paths", json.loads(gzip.decompress(response.data)))
+
+        self.assertEqual(compress.call_count, 1)
@@ -0,0 +1,336 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from werkzeug.security import generate_password_hash
+
+import config
+from models import Customer
+from models.abc import db
+from server import server
+from utils.errors import ServiceUnavailable
+from utils.password_hasher import password_hasher
+
+# an already hashed password, as partners send them to the import
+PASSWORD_HASH = generate_password_hash("secret", "pbkdf2:sha256:1000", 8)
+
+
+class TestCustomer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        server.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        cls.client = server.test_client()
+
+    def setUp(self):
+        db.create_all()
+        for index, city in enumerate(["Lagos", "Abuja", "Lagos", "Lagos", "Kano"]):
+            db.session.add(Customer(username=f"user{index}", email=f"user{index}@mail.com",
+                                    first_name="John", last_name="Doe", city=city,
+                                    password="hash"))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def get_json(self, url):
+        response = self.client.get(url)
+        return response.status_code, json.loads(response.data.decode("utf-8"))
+
+    def test_get_all_paginates_with_cursor(self):
+        """ The GET on `/customers` should walk every customer page by page """
+        status, page = self.get_json("/api/customers?limit=2")
+        self.assertEqual(status, 200)
+        self.assertEqual([c["username"] for c in page["data"]], ["user0", "user1"])
+        self.assertNotIn("password", page["data"][0])
+
+        usernames = [c["username"] for c in page["data"]]
+        while page["next_cursor"]:
+            status, page = self.get_json(f"/api/customers?limit=2&after={page['next_cursor']}")
+            self.assertEqual(status, 200)
+            usernames += [c["username"] for c in page["data"]]
+
+        self.assertEqual(usernames, [f"user{index}" for index in range(5)])
+
+    def test_get_all_filters(self):
+        """ The GET on `/customers` should only return customers matching the filters """
+        status, page = self.get_json("/api/customers?city=Lagos&limit=2")
+        self.assertEqual([c["username"] for c in page["data"]], ["user0", "user2"])
+
+        status, page = self.get_json(f"/api/customers?city=Lagos&after={page['next_cursor']}")
+        self.assertEqual([c["username"] for c in page["data"]], ["user3"])
+        self.assertIsNone(page["next_cursor"])
+
+    def test_get_all_invalid_cursor(self):
+        """ The GET on `/customers` should reject a cursor it did not issue """
+        status, body = self.get_json("/api/customers?after=not-a-cursor")
+        self.assertEqual(status, 400)
+
+    def test_get_one_fields(self):
+        """ The GET on `/customers/<id>` should only return the requested fields """
+        status, body = self.get_json("/api/customers/2?fields=email,first_name")
+        self.assertEqual(status, 200)
+        self.assertEqual(body["data"], {"id": 2, "email": "user1@mail.com", "first_name": "John"})
+
+        status, body = self.get_json("/api/customers/2?fields=email,password")
+        self.assertEqual(status, 400)
+
+        status, body = self.get_json("/api/customers/42")
+        self.assertEqual(status, 404)
+
+    def test_get_all_fields(self):
+        """ The GET on `/customers` should only return the requested fields """
+        status, page = self.get_json("/api/customers?fields=city&limit=2")
+        self.assertEqual(page["data"], [{"id": 1, "city": "Lagos"}, {"id": 2, "city": "Abuja"}])
+
+    def test_get_one_conditional(self):
+        """ The GET on `/customers/<id>` should answer 304 while the customer is unchanged """
+        response = self.client.get("/api/customers/2")
+        etag = response.headers["ETag"]
+        self.assertIn("Last-Modified", response.headers)
+
+        response = self.client.get("/api/customers/2", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+        response = self.client.get("/api/customers/2?fields=email", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+
+        customer = Customer.query.get(2)
+        customer.first_name = "Jane"
+        customer.save()
+        response = self.client.get("/api/customers/2", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_get_all_conditional(self):
+        """ The GET on `/customers` should answer 304 while the page is unchanged """
+        response = self.client.get("/api/customers?limit=2")
+        etag = response.headers["ETag"]
+
+        response = self.client.get("/api/customers?limit=2", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        Customer.query.get(1).delete()
+        response = self.client.get("/api/customers?limit=2", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_all_conditional_last_page(self):
+        """ The GET on `/customers` should not answer 304 for a full last page
+            once customers are added after it, its next_cursor changed """
+        response = self.client.get("/api/customers?limit=5")
+        self.assertIsNone(json.loads(response.data.decode("utf-8"))["next_cursor"])
+        etag = response.headers["ETag"]
+
+        db.session.add(Customer(username="user5", email="user5@mail.com", first_name="John",
+                                last_name="Doe", password="hash"))
+        db.session.commit()
+        response = self.client.get("/api/customers?limit=5", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(json.loads(response.data.decode("utf-8"))["next_cursor"])
+
+    def patch(self, url, data, headers=None):
+        response = self.client.patch(url, content_type="application/json",
+                                     data=json.dumps(data), headers=headers or {})
+        return response, json.loads(response.data.decode("utf-8"))
+
+    def test_patch(self):
+        """ The PATCH on `/customers/<id>` should only update the fields sent """
+        response, body = self.patch("/api/customers/2", {"first_name": "Jane", "city": None})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((body["data"]["first_name"], body["data"]["city"]), ("Jane", None))
+        self.assertEqual((body["data"]["last_name"], body["data"]["version"]), ("Doe", 2))
+        customer = Customer.query.get(2)
+        self.assertEqual((customer.first_name, customer.version), ("Jane", 2))
+
+        response, body = self.patch("/api/customers/2", {"username": "taken"})
+        self.assertEqual(response.status_code, 400)
+        # fields that cannot be updated are refused, not ignored, along updatable ones
+        response, body = self.patch("/api/customers/2", {"first_name": "Ada",
+                                                         "username": "hacker", "password": "x"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password, username", body["message"])
+        customer = Customer.query.get(2)
+        self.assertEqual((customer.first_name, customer.username), ("Jane", "user1"))
+        response, body = self.patch("/api/customers/42", {"first_name": "Jane"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_patch_if_match(self):
+        """ The PATCH on `/customers/<id>` should refuse to update a stale version """
+        etag = self.client.get("/api/customers/2").headers["ETag"]
+
+        response, body = self.patch("/api/customers/2", {"first_name": "Jane"},
+                                    headers={"If-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+        response, body = self.patch("/api/customers/2", {"first_name": "Joan"},
+                                    headers={"If-Match": etag})
+        self.assertEqual(response.status_code, 412)
+        response, body = self.patch("/api/customers/2", {"first_name": "Joan", "version": 1})
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(Customer.query.get(2).first_name, "Jane")
+
+    def test_export_ndjson(self):
+        """ The GET on `/customers/export` should stream one customer per line """
+        response = self.client.get("/api/customers/export")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = response.data.decode("utf-8").splitlines()
+        customers = [json.loads(line) for line in lines]
+        self.assertEqual([c["username"] for c in customers], [f"user{index}" for index in range(5)])
+        self.assertNotIn("password", customers[0])
+
+    def test_export_csv(self):
+        """ The GET on `/customers/export?format=csv` should stream a header and the customers """
+        response = self.client.get("/api/customers/export?format=csv")
+
+        self.assertEqual(response.status_code, 200)
+        lines = response.data.decode("utf-8").splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[0].startswith("id,username,"))
+        self.assertNotIn("password", lines[0])
+
+    def test_import_ndjson(self):
+        """ The POST on `/customers/import` should create the valid customers and report the others """
+        lines = [
+            {"username": "new0", "email": "new0@mail.com", "first_name": "Ada",
+             "last_name": "Obi", "password": "secret"},
+            {"username": "user0", "email": "other@mail.com", "first_name": "Ada",
+             "last_name": "Obi", "password_hash": PASSWORD_HASH},
+            {"username": "new1", "email": "not-an-email", "first_name": "Ada",
+             "last_name": "Obi", "password_hash": PASSWORD_HASH},
+            {"username": "new2", "email": "new0@mail.com", "first_name": "Ada",
+             "last_name": "Obi", "password_hash": PASSWORD_HASH},
+            {"username": "new3", "email": "new3@mail.com", "first_name": "Ada",
+             "last_name": "Obi", "password_hash": PASSWORD_HASH, "city": "Enugu"},
+            {"username": "new4", "email": "new4@mail.com", "first_name": "Ada",
+             "last_name": "Obi", "password_hash": "secret"},
+            {"username": "USER1", "email": "new5@mail.com", "first_name": "Ada",
+             "last_name": "Obi", "password_hash": PASSWORD_HASH},
+            {"username": "new6", "email": "User2@Mail.com", "first_name": "Ada",
+             "last_name": "Obi", "password_hash": PASSWORD_HASH},
+        ]
+        data = "\n".join(json.dumps(line) for line in lines) + "\n{not json\n"
+        response = self.client.post("/api/customers/import", data=data,
+                                    content_type="application/x-ndjson")
+
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.data.decode("utf-8"))["data"]
+        self.assertEqual((body["received"], body["created"]), (9, 2))
+        # logins are taken whatever their case
+        self.assertEqual([error["line"] for error in body["errors"]], [2, 3, 4, 6, 7, 8, 9])
+        self.assertTrue(Customer.query.filter_by(username="new0").one().check_password("secret"))
+        new3 = Customer.query.filter_by(username="new3").one()
+        self.assertEqual((new3.city, new3.check_password("secret")), ("Enugu", True))
+
+    def test_import_commits_chunks(self):
+        """ The POST on `/customers/import` should commit chunk by chunk,
+            a failing chunk keeps the chunks before it """
+        data = "".join(json.dumps({"username": f"new{index}", "email": f"new{index}@mail.com",
+                                   "first_name": "Ada", "last_name": "Obi",
+                                   "password": "secret"}) + "\n" for index in range(5))
+        hash_many = password_hasher.hash_many
+        calls = []
+
+        def fail_third_chunk(passwords):
+            calls.append(passwords)
+            if len(calls) == 3:
+                raise ServiceUnavailable("Hashing the passwords took too long")
+            return hash_many(passwords)
+
+        with patch.object(config, "IMPORT_CHUNK_SIZE", 2), patch.object(password_hasher, "hash_many", fail_third_chunk):
+            response = self.client.post("/api/customers/import", data=data,
+                                        content_type="application/x-ndjson")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("the 4 customers of the lines before line 5 were created",
+                      json.loads(response.data.decode("utf-8"))["message"])
+        self.assertEqual(Customer.query.filter(Customer.username.like("new%")).count(), 4)
+
+    def test_import_csv(self):
+        """ The POST on `/customers/import` should read a CSV upload after its header """
+        data = ("username,email,first_name,last_name,password_hash,city\n"
+                f"new0,new0@mail.com,Ada,Obi,{PASSWORD_HASH},Lagos\n"
+                f"new1,new1@mail.com,Ada,,{PASSWORD_HASH},Lagos\n")
+        response = self.client.post("/api/customers/import", data=data, content_type="text/csv")
+
+        body = json.loads(response.data.decode("utf-8"))["data"]
+        self.assertEqual(body["created"], 1)
+        self.assertEqual(body["errors"], [{"line": 3, "error": "last_name is required"}])
+
+        response = self.client.post("/api/customers/import", data="{}", content_type="text/plain")
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_many_by_ids(self):
+        """ The GET on `/customers?ids=` should return the customers in the order of the ids """
+        status, body = self.get_json("/api/customers?ids=4,2,42,4&fields=username")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body["data"], [{"id": 4, "username": "user3"},
+                                        {"id": 2, "username": "user1"}])
+        self.assertEqual(body["missing"], [42])
+
+        status, body = self.get_json("/api/customers?ids=1,two")
+        self.assertEqual(status, 400)
+
+    def test_batch(self):
+        """ The POST on `/customers/batch` should return the customers of a list of ids """
+        response = self.client.post("/api/customers/batch", content_type="application/json",
+                                    data=json.dumps({"ids": [5, 1, 9]}))
+
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.data.decode("utf-8"))
+        self.assertEqual([c["username"] for c in body["data"]], ["user4", "user0"])
+        self.assertEqual(body["missing"], [9])
+
+        response = self.client.post("/api/customers/batch", content_type="application/json",
+                                    data=json.dumps({"ids": list(range(1000))}))
+        self.assertEqual(response.status_code, 400)
+
+    def test_search(self):
+        """ The GET on `/customers/search` should return the customers containing the text """
+        customer = Customer.query.get(3)
+        customer.first_name, customer.email = "Chioma", "chi_oma@mail.com"
+        db.session.commit()
+
+        status, body = self.get_json("/api/customers/search?q=HIOM&fields=first_name")
+        self.assertEqual(status, 200)
+        self.assertEqual(body["data"], [{"id": 3, "first_name": "Chioma"}])
+
+        # the wildcards of LIKE are searched as they are
+        status, body = self.get_json("/api/customers/search?q=i_om")
+        self.assertEqual([c["id"] for c in body["data"]], [3])
+        status, body = self.get_json("/api/customers/search?q=%25%25%25")
+        self.assertEqual(body["data"], [])
+
+        status, body = self.get_json("/api/customers/search?q=ch")
+        self.assertEqual(status, 400)
+
+    def test_changes(self):
+        """ The GET on `/customers/changes` should return what changed since the cursor """
+        with patch.object(config, "CHANGES_LAG", 0):
+            status, body = self.get_json("/api/customers/changes?limit=3")
+            self.assertEqual([c["id"] for c in body["data"]], [1, 2, 3])
+            self.assertTrue(body["has_more"])
+            status, body = self.get_json(f"/api/customers/changes?since={body['next_cursor']}")
+            self.assertEqual([c["id"] for c in body["data"]], [4, 5])
+            self.assertFalse(body["has_more"])
+            cursor = body["next_cursor"]
+
+            status, body = self.get_json(f"/api/customers/changes?since={cursor}")
+            self.assertEqual((body["data"], body["deleted"]), ([], []))
+
+            Customer.query.get(2).first_name = "Jane"
+            Customer.query.get(4).delete()
+            db.session.commit()
+
+            status, body = self.get_json(f"/api/customers/changes?since={cursor}&fields=first_name")
+            self.assertEqual(body["data"], [{"id": 2, "first_name": "Jane"}])
+            self.assertEqual(body["deleted"], [4])
+
+        # the most recent changes wait for the lag window
+        status, body = self.get_json(f"/api/customers/changes?since={cursor}")
+        self.assertEqual((body["data"], body["deleted"]), ([], []))
@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+from flasgger import Swagger
+
+from resources import CustomerResource
+from server import server
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+class TestDocs(unittest.TestCase):
+    def test_swag_from(self):
+        """ The views should carry their spec file the way flasgger reads it """
+        path = CustomerResource.get_one.swag_path
+        self.assertTrue(path.endswith(os.path.join("swagger", "customer", "get_one.yml")))
+        self.assertTrue(os.path.exists(path))
+
+    def test_spec_built_once(self):
+        """ The spec should be built on the first request then served with an ETag """
+        client = server.test_client()
+        with patch.object(Swagger, "get_apispecs", wraps=server.extensions["flasgger"]
+                          .get_apispecs) as get_apispecs:
+            responses = [client.get("/apispec_1.json") for _ in range(3)]
+
+        self.assertLessEqual(get_apispecs.call_count, 1)
+        self.assertEqual(len({response.data for response in responses}), 1)
+        self.assertIn("/api/customers", json.loads(responses[0].data)["paths"])
+
+        etag = responses[0].headers["ETag"]
+        response = client.get("/apispec_1.json", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_disabled(self):
+        """ Without SWAGGER_ENABLED flasgger should not even be imported """
+        script = ("import sys; from server import server; "
+                  "print('flasgger' in sys.modules, server.test_client().get('/apidocs/').status_code)")
+        env = dict(os.environ, SWAGGER_ENABLED="false", ENVIRONEMENT="DEV")
+        output = subprocess.run([sys.executable, "-c", script], cwd=SRC, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split()[-2:], ["False", "404"])
@@ -0,0 +1,124 @@
+import json
+import threading
+import unittest
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import config
+from models import EmailOutbox
+from models.abc import db
+from repositories import EmailOutboxRepository
+from server import server
+from utils import mail_service
+from workers import EmailOutboxWorker
+
+
+class FakeMailjet(BaseHTTPRequestHandler):
+    """ A local Mailjet send endpoint, refusing the recipients starting with `fail` """
+
+    received = []
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeMailjet.received.append((self.path, data))
+        results = []
+        for message in data["Messages"]:
+            if message["To"][0]["Email"].startswith("fail"):
+                results.append({"Status": "error", "Errors": [{"ErrorMessage": "refused"}]})
+            else:
+                results.append({"Status": "success", "CustomID": message.get("CustomID", "")})
+        status = 200 if all(result["Status"] == "success" for result in results) else 400
+        body = json.dumps({"Messages": results})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+class TestEmailOutbox(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        server.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        cls.mailjet = HTTPServer(("127.0.0.1", 0), FakeMailjet)
+        threading.Thread(target=cls.mailjet.serve_forever, daemon=True).start()
+        cls.api_url = config.EMAIL_API_URL
+        config.EMAIL_API_URL = f"http://127.0.0.1:{cls.mailjet.server_port}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.mailjet.shutdown()
+        config.EMAIL_API_URL = cls.api_url
+
+    def setUp(self):
+        db.create_all()
+        FakeMailjet.received = []
+        self.worker = EmailOutboxWorker(server, batch_size=10, concurrency=4)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def enqueue(self, email):
+        return EmailOutboxRepository.enqueue(to={"name": "John Doe", "email": email},
+                                             subject="Hello", message="<p>Hello</p>",
+                                             sender={"name": "Gomerce", "email": "no@gomerce.com"})
+
+    def test_run_once_delivers_pending_emails(self):
+        """ The worker should send the pending emails and mark them sent """
+        self.enqueue("jdoe@mail.com")
+        self.enqueue("jroe@mail.com")
+
+        self.assertEqual(self.worker.run_once(), 2)
+
+        self.assertEqual(len(FakeMailjet.received), 1)
+        path, data = FakeMailjet.received[0]
+        self.assertEqual(path, "/v3.1/send")
+        self.assertEqual(len(data["Messages"]), 2)
+        statuses = [email.status for email in EmailOutbox.query.all()]
+        self.assertEqual(statuses, [EmailOutbox.SENT, EmailOutbox.SENT])
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_run_once_requeues_only_failed_emails(self):
+        """ The emails refused in a batch should be the only ones queued again """
+        sent_id = self.enqueue("jdoe@mail.com").id
+        failed_id = self.enqueue("fail@mail.com").id
+
+        self.assertEqual(self.worker.run_once(), 2)
+        self.assertEqual(len(FakeMailjet.received), 1)
+
+        self.assertEqual(EmailOutbox.query.get(sent_id).status, EmailOutbox.SENT)
+        failed = EmailOutbox.query.get(failed_id)
+        self.assertEqual(failed.status, EmailOutbox.PENDING)
+        self.assertIn("refused", failed.last_error)
+
+    def test_run_once_retries_with_backoff(self):
+        """ A failed email should be retried later, then given up on """
+        email_id = self.enqueue("fail@mail.com").id
+
+        self.assertEqual(self.worker.run_once(), 1)
+        email = EmailOutbox.query.get(email_id)
+        self.assertEqual((email.status, email.attempts), (EmailOutbox.PENDING, 1))
+        self.assertGreater(email.next_attempt_at, datetime.utcnow())
+        self.assertIsNotNone(email.last_error)
+        # not due yet
+        self.assertEqual(self.worker.run_once(), 0)
+
+        email = EmailOutbox.query.get(email_id)
+        email.attempts = config.OUTBOX_MAX_ATTEMPTS - 1
+        email.next_attempt_at = datetime.utcnow()
+        db.session.commit()
+        self.assertEqual(self.worker.run_once(), 1)
+        self.assertEqual(EmailOutbox.query.get(email_id).status, EmailOutbox.FAILED)
+
+    def test_mail_session_is_reused(self):
+        """ Sends should share the session of the process until it forks """
+        session = mail_service.get_session()
+        self.assertIs(mail_service.get_session(), session)
+        self.assertEqual(session.auth, (config.EMAIL_API_KEY, config.EMAIL_API_SECRET))
+
+        mail_service._forget_session()
+        self.assertIsNot(mail_service.get_session(), session)
@@ -0,0 +1,53 @@
+import json
+import unittest
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+from server import server
+from utils import json_provider
+
+
+class TestJSONProvider(unittest.TestCase):
+    value = {
+        "id": 1,
+        "created_at": datetime(2026, 10, 17, 18, 30, 5),
+        "birthday": date(1990, 1, 2),
+        "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "balance": Decimal("10.50"),
+        "name": "Adaẹze",
+    }
+    expected = {
+        "id": 1,
+        "created_at": "2026-10-17T18:30:05",
+        "birthday": "1990-01-02",
+        "uuid": "12345678-1234-5678-1234-567812345678",
+        "balance": "10.50",
+        "name": "Adaẹze",
+    }
+
+    def encode(self):
+        with server.app_context():
+            data = json.loads(server.json.response(self.value).get_data())
+            self.assertEqual(json.loads(server.json.dumps(self.value)), data)
+            return data
+
+    @unittest.skipUnless(json_provider.orjson, "orjson is optional, it is not installed")
+    def test_encodes_the_same_with_both_encoders(self):
+        """ The provider should encode the same values with orjson and the stdlib """
+        self.assertEqual(self.encode(), self.expected)
+
+        with patch.object(json_provider, "orjson", None):
+            self.assertEqual(self.encode(), self.expected)
+
+    def test_encodes_without_orjson(self):
+        """ The stdlib encoder should encode the values orjson encodes natively """
+        with patch.object(json_provider, "orjson", None):
+            self.assertEqual(self.encode(), self.expected)
+
+    def test_keeps_key_order(self):
+        """ The keys should keep the order of the serializer """
+        with server.app_context():
+            self.assertEqual(list(json.loads(server.json.dumps({"id": 1, "b": 2, "a": 3}))),
+                             ["id", "b", "a"])
@@ -0,0 +1,70 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import config
+from models import CustomerTombstone, UsedVerificationToken, VerificationToken
+from models.abc import db
+from repositories import VerificationTokenRepository
+from server import server
+from workers import MaintenanceScheduler
+
+
+class TestMaintenance(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        server.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+
+    def setUp(self):
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+
+    def test_create_token(self):
+        """ Tokens should be created and saved with a unique token """
+        first = VerificationTokenRepository.create(user_id=1, user_type="customer",
+                                                   email=True, phone=False)
+        second = VerificationTokenRepository.create(user_id=1, user_type="customer",
+                                                    email=True, phone=False)
+
+        self.assertNotEqual(first.token, second.token)
+        self.assertEqual(VerificationToken.query.count(), 2)
+        self.assertEqual(VerificationTokenRepository.get(1, first.token, "customer").id, first.id)
+
+    def test_purge_expired_tokens(self):
+        """ The scheduler should delete the expired tokens, batch after batch """
+        past = datetime.now() - timedelta(minutes=1)
+        for index in range(5):
+            db.session.add(VerificationToken(token=f"expired{index}", user_id=index,
+                                             user_type="customer", expires_at=past))
+        db.session.add(UsedVerificationToken(digest="a" * 32,
+                                             expires_at=datetime.utcnow() - timedelta(minutes=1)))
+        db.session.commit()
+        valid = VerificationTokenRepository.create(user_id=1, user_type="customer",
+                                                   email=True, phone=False).token
+
+        with patch.object(config, "PURGE_BATCH_SIZE", 2):
+            scheduler = MaintenanceScheduler(server).add_default_jobs()
+        delay = scheduler.run_pending()
+
+        self.assertEqual([token.token for token in VerificationToken.query.all()], [valid])
+        self.assertEqual(UsedVerificationToken.query.count(), 0)
+        self.assertAlmostEqual(delay, config.PURGE_INTERVAL, delta=5)
+
+    def test_purge_old_tombstones(self):
+        """ The scheduler should delete the tombstones past their retention only """
+        now = datetime.utcnow()
+        retention = timedelta(seconds=config.TOMBSTONE_RETENTION)
+        for customer_id in range(5):
+            db.session.add(CustomerTombstone(customer_id=customer_id,
+                                             deleted_at=now - retention - timedelta(hours=1)))
+        db.session.add(CustomerTombstone(customer_id=42, deleted_at=now - timedelta(hours=1)))
+        db.session.commit()
+
+        with patch.object(config, "PURGE_BATCH_SIZE", 2):
+            MaintenanceScheduler(server).add_default_jobs().run_pending()
+
+        self.assertEqual([tombstone.customer_id for tombstone in CustomerTombstone.query.all()],
+                         [42])
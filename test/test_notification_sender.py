@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+import config
+from models import Customer
+from utils import notification_sender
+from utils.notification_sender import (TEMPLATES_FOLDER, Notification, get_template_environment,
+                                       precompile_templates)
+
+
+class TestNotificationSender(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        patches = [
+            patch.object(config, "TEMPLATE_BYTECODE_CACHE_DIR", self.cache_dir.name),
+            # every test starts without the environment of the process
+            patch.object(notification_sender, "_environment", None),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.cache_dir.cleanup)
+
+    def test_environment_shared(self):
+        """ Every Notification should render with the environment of the process """
+        first, second = Notification(email=True), Notification(email=True)
+
+        self.assertIs(first.env, second.env)
+        self.assertIs(first.env, get_template_environment())
+        self.assertIsNone(Notification(sms=True).env)
+
+    def test_precompile_templates(self):
+        """ Precompiling should leave the bytecode of every template in the cache """
+        precompile_templates()
+
+        environment = get_template_environment()
+        names = environment.list_templates()
+        self.assertEqual(set(names), set(os.listdir(TEMPLATES_FOLDER)))
+
+        # read back from the files, as the next process starting would
+        cache = FileSystemBytecodeCache(self.cache_dir.name)
+        for name in names:
+            source, filename, _ = environment.loader.get_source(environment, name)
+            bucket = cache.get_bucket(environment, name, filename, source)
+            self.assertIsNotNone(bucket.code, name)
+
+    def test_render_unchanged(self):
+        """ A template should render as with an environment of its own """
+        customer = Customer(first_name="John <admin>", last_name="Doe")
+        kwargs = dict(confirm_url="http://localhost/confirm?token=a&b", customer=customer)
+
+        environment = Environment(loader=FileSystemLoader(TEMPLATES_FOLDER),
+                                  autoescape=select_autoescape(['html', 'xml']))
+        expected = environment.get_template("user_verification_email.html").render(**kwargs)
+
+        precompile_templates()
+        html = Notification(email=True).create_email_template("user_verification_email.html",
+                                                              **kwargs)
+        self.assertEqual(html, expected)
+        self.assertIn("John &lt;admin&gt;", html)
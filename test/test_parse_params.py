@@ -0,0 +1,85 @@
+import json
+import unittest
+
+from flask_restful.reqparse import Argument, RequestParser
+from werkzeug.exceptions import BadRequest
+
+from server import server
+from utils import parse_params
+
+
+ARGUMENTS = (
+    Argument("name", location="json", required=True, help="The name."),
+    Argument("age", type=int, location="json", help="The age. {error_msg}"),
+    Argument("tags", location="json", action="append"),
+    Argument("nickname", location="json", store_missing=False),
+    Argument("format", dest="export_format", location="args", default="ndjson",
+             choices=("ndjson", "csv")),
+)
+
+
+@parse_params(*ARGUMENTS)
+def fast(**kwargs):
+    return kwargs
+
+
+@parse_params(
+    Argument("name", location="json", required=True),
+    Argument("code", location="args", trim=True),
+)
+def fallback(**kwargs):
+    return kwargs
+
+
+class TestParseParams(unittest.TestCase):
+    def parse(self, func, body=None, query_string=None):
+        with server.test_request_context("/", method="POST", json=body,
+                                         query_string=query_string):
+            return func()
+
+    def test_fast_path(self):
+        """ The compiled arguments should be parsed like reqparse would """
+        kwargs = self.parse(fast, {"name": "jdoe", "age": "42", "tags": ["a", "b"]},
+                            {"format": "csv"})
+        self.assertEqual(kwargs, {"name": "jdoe", "age": 42, "tags": ["a", "b"],
+                                  "export_format": "csv"})
+
+        kwargs = self.parse(fast, {"name": "jdoe", "nickname": None, "tags": "a"})
+        self.assertEqual(kwargs, {"name": "jdoe", "age": None, "tags": ["a"], "nickname": None,
+                                  "export_format": "ndjson"})
+
+    def test_structured_errors(self):
+        """ Every invalid parameter should be reported under its name """
+        with self.assertRaises(BadRequest) as context:
+            self.parse(fast, {"age": "old"}, {"format": "xml"})
+
+        errors = context.exception.data["message"]
+        self.assertEqual(errors, {
+            "name": "The name.",
+            "age": "The age. invalid literal for int() with base 10: 'old'",
+            "format": "xml is not a valid choice",
+        })
+
+        # the same messages as reqparse
+        parser = RequestParser(bundle_errors=True)
+        for argument in ARGUMENTS:
+            parser.add_argument(argument)
+        with self.assertRaises(BadRequest) as context:
+            self.parse(parser.parse_args, {"age": "old"}, {"format": "xml"})
+        self.assertEqual(context.exception.data["message"], errors)
+
+        response = server.test_client().post("/api/customers/batch", json={"ids": ["x"]})
+        body = json.loads(response.data)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ids", body["errors"])
+
+    def test_fallback(self):
+        """ Arguments the fast path does not support should still be parsed by reqparse """
+        kwargs = self.parse(fallback, {"name": "jdoe"}, {"code": " 42 "})
+        self.assertEqual(kwargs, {"name": "jdoe", "code": "42"})
+
+        # every invalid argument is reported, as by the fast path
+        with self.assertRaises(BadRequest) as context:
+            self.parse(fallback, {})
+        self.assertEqual(context.exception.data["message"],
+                         {"name": "Missing required parameter in the JSON body"})
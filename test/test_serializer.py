@@ -0,0 +1,35 @@
+import unittest
+from datetime import datetime
+
+from models import Customer
+
+
+class TestSerializer(unittest.TestCase):
+    def setUp(self):
+        self.customer = Customer(id=1, username="jdoe", first_name="John", last_name="Doe",
+                                 email="jdoe@mail.com", password="hash", city=None,
+                                 created_at=datetime(2022, 9, 21, 17, 30), updated_at=None)
+
+    def test_json(self):
+        """ The json of a model should exclude `to_json_filter` and format dates """
+        data = self.customer.json
+
+        self.assertNotIn("password", data)
+        self.assertEqual(data["created_at"], "2022-09-21")
+        self.assertIsNone(data["updated_at"])
+        self.assertEqual(data["username"], "jdoe")
+
+    def test_dump_row(self):
+        """ A row of the plan columns should serialize like the instance """
+        serializer = Customer.serializer()
+        row = tuple(getattr(self.customer, column) for column in serializer.columns)
+
+        self.assertEqual(serializer.dump_row(row), self.customer.json)
+
+    def test_subset(self):
+        """ A subset plan should only output its columns, in the plan order """
+        serializer = Customer.serializer().subset(["email", "id"])
+
+        self.assertEqual(serializer.columns, ("id", "email"))
+        self.assertEqual(serializer.dump(self.customer), {"id": 1, "email": "jdoe@mail.com"})
+        self.assertIs(Customer.serializer().subset(["id", "email"]), serializer)
@@ -0,0 +1,37 @@
+import os
+import unittest
+
+from utils.startup_profile import profile, total_time
+
+# cold start budget of `import server` without the docs, in milliseconds
+BUDGET = int(os.getenv("STARTUP_BUDGET_MS", "1500"))
+# only imported by the processes using them
+LAZY_MODULES = ["flasgger", "flask_migrate", "requests", "utils.mail_service",
+                "utils.notification_sender"]
+
+
+class TestStartup(unittest.TestCase):
+    def test_cold_start_budget(self):
+        """ The server should start within the budget, without its lazy dependencies """
+        modules = profile("server", env={"SWAGGER_ENABLED": "false", "ENVIRONEMENT": "DEV",
+                                         "EMAIL_API_KEY": ""})
+
+        imported = {name for name, _, _, _ in modules}
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, imported)
+        self.assertLess(total_time(modules) * 1000, BUDGET)
+
+    def test_templates_precompiled_with_emails(self):
+        """ A server sending emails should still compile its templates when it starts """
+        modules = profile("server", env={"SWAGGER_ENABLED": "false", "ENVIRONEMENT": "DEV",
+                                         "EMAIL_API_KEY": "key"})
+
+        self.assertIn("utils.notification_sender", {name for name, _, _, _ in modules})
+
+    def test_lazy_attributes(self):
+        """ The lazy attributes of utils should still be importable from it """
+        from utils import Notification, generate_token
+        from utils.notification_sender import Notification as NotificationClass
+
+        self.assertIs(Notification, NotificationClass)
+        self.assertTrue(callable(generate_token))
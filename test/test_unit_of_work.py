@@ -0,0 +1,72 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from flask import g
+from werkzeug.security import generate_password_hash
+
+import config
+from models import Customer
+from models.abc import db
+from models.unit_of_work import unit_of_work
+from server import server
+
+
+class TestUnitOfWork(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        server.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        cls.client = server.test_client()
+
+    def setUp(self):
+        self.context = server.app_context()
+        self.context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    @staticmethod
+    def customer(index):
+        return Customer(username=f"user{index}", email=f"user{index}@mail.com",
+                        first_name="John", last_name="Doe", password="hash")
+
+    def test_saves_committed_once(self):
+        """ The saves inside a unit of work should be committed together at its end """
+        g.db_commits = 0
+        with unit_of_work():
+            self.customer(0).save()
+            with unit_of_work():
+                self.customer(1).save()
+            self.assertEqual(g.db_commits, 0)
+        self.assertEqual(g.db_commits, 1)
+
+        db.session.remove()
+        self.assertEqual(Customer.query.count(), 2)
+
+    def test_error_rolls_back(self):
+        """ An error inside a unit of work should roll back every save """
+        with self.assertRaises(ValueError):
+            with unit_of_work():
+                self.customer(0).save()
+                raise ValueError
+
+        self.assertEqual(Customer.query.count(), 0)
+
+    def test_request_commit_count(self):
+        """ A request should commit its changes once and report it """
+        customer = self.customer(0)
+        customer.password = generate_password_hash("secret", "pbkdf2:sha256:1000", 8)
+        customer.save()
+        db.session.remove()
+
+        with patch.object(config, "DB_COMMIT_HEADER", True):
+            response = self.client.post("/api/login-customer", content_type="application/json",
+                                        data=json.dumps({"username": "user0",
+                                                         "password": "secret"}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-DB-Commits"], "1")
+        self.assertFalse(Customer.query.first().password_needs_rehash())